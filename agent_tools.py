@@ -1,42 +1,191 @@
 # 10/14 21:40
 
 import json
-import requests
-from openai import OpenAI
+import orjson
 from datetime import datetime, timedelta, timezone
-import pickle
-from google.auth.transport.requests import Request
-from google_auth_oauthlib.flow import InstalledAppFlow
-from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
-from google.oauth2.credentials import Credentials
-import pytz
-from playwright.async_api import async_playwright
+from zoneinfo import ZoneInfo
 import re
 import asyncio
-import traceback
 import os
+import time
+import random
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+import functools
+import inspect
+import string
 from dotenv import load_dotenv
-import tech_news
+
+from disk_cache import DiskCache
 
 # 加载环境变量
 load_dotenv()
 
+# 日志级别可通过环境变量 AGENT_LOG_LEVEL 调整（默认INFO，调试时设为DEBUG）
+logger = logging.getLogger("agent_tools")
+logger.setLevel(os.environ.get("AGENT_LOG_LEVEL", "INFO").upper())
+
+# HTML代码块标记（开头的```html、结尾的```以及正文中残留的标记）
+_CODEFENCE_RE = re.compile(r'^```html\s*|\s*```$|```html|```', re.MULTILINE)
+
+# LLM响应中的工具调用JSON代码块（兼容```JSON、省略语言标记及首尾空白）
+_JSON_BLOCK_RE = re.compile(r"```(?:json)?\s*([\[{].*?[\]}])\s*```", re.DOTALL | re.IGNORECASE)
+
+# 北京时区（标准库zoneinfo，直接用replace(tzinfo=...)附加时区）
+_BEIJING_TZ = ZoneInfo('Asia/Shanghai')
+
 
 def create_openai_client():
     """安全地创建OpenAI客户端"""
+    # openai/httpx导入较重，延迟到首次创建客户端时加载
+    import httpx
+    from openai import OpenAI
+
     return OpenAI(
         base_url="https://ark.cn-beijing.volces.com/api/v3/bots",
-        api_key=os.environ.get("ARK_API_KEY")
+        api_key=os.environ.get("ARK_API_KEY"),
+        # 启用HTTP/2和连接池，保持长连接
+        http_client=httpx.Client(
+            limits=httpx.Limits(max_keepalive_connections=20, max_connections=50),
+            http2=True
+        )
     )
 
 
+_DOUBAO_CLIENT = None
+_ASYNC_DOUBAO_CLIENT = None
+
+
+def get_doubao_client():
+    """获取进程内共享的豆包客户端，所有LLM调用复用同一个连接池"""
+    global _DOUBAO_CLIENT
+    if _DOUBAO_CLIENT is None:
+        _DOUBAO_CLIENT = create_openai_client()
+    return _DOUBAO_CLIENT
+
+
+def get_async_doubao_client():
+    """获取进程内共享的豆包异步客户端，调用时不阻塞事件循环"""
+    global _ASYNC_DOUBAO_CLIENT
+    if _ASYNC_DOUBAO_CLIENT is None:
+        import httpx
+        from openai import AsyncOpenAI
+
+        _ASYNC_DOUBAO_CLIENT = AsyncOpenAI(
+            base_url="https://ark.cn-beijing.volces.com/api/v3/bots",
+            api_key=os.environ.get("ARK_API_KEY"),
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(max_keepalive_connections=20, max_connections=50),
+                http2=True
+            )
+        )
+    return _ASYNC_DOUBAO_CLIENT
+
+
+_BREVO_SESSION = None
+
+# 任务优先级对应的展示图标
+_PRIORITY_EMOJI = {"low": "⚪", "medium": "🟡", "high": "🔴"}
+
+# 邮件HTML正文模板
+_EMAIL_HTML_TPL = string.Template("""
+                <div style="font-family: Arial, sans-serif; line-height: 1.6;">
+                    <h2>$subject</h2>
+                    <div style="white-space: pre-line; padding: 20px; background: #f9f9f9; border-radius: 5px;">
+                        $body
+                    </div>
+                    <p style="color: #999; font-size: 12px; margin-top: 20px;">
+                        此邮件由智能助手自动发送
+                    </p>
+                </div>
+                """)
+
+
+def get_brevo_session():
+    """获取进程内共享的Brevo会话，复用到api.brevo.com的长连接"""
+    global _BREVO_SESSION
+    if _BREVO_SESSION is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        from urllib3.util.retry import Retry
+
+        _BREVO_SESSION = requests.Session()
+        _BREVO_SESSION.mount("https://", HTTPAdapter(
+            pool_connections=4,
+            pool_maxsize=16,
+            # 发送邮件的POST不是幂等的：只重试连接失败和429（请求确定未被处理），
+            # 读超时或5xx时Brevo可能已经发出邮件，重发会让收件人收到重复邮件
+            max_retries=Retry(
+                total=3,
+                connect=3,
+                read=0,
+                other=0,
+                backoff_factor=0.5,
+                status_forcelist=[429],
+                allowed_methods=frozenset({"POST"}),
+                respect_retry_after_header=True,
+                raise_on_status=False
+            )
+        ))
+    return _BREVO_SESSION
+
+
+@functools.lru_cache(maxsize=None)
+def _handler_params(func):
+    """工具处理函数接受的参数名集合（按函数缓存，避免每次调用都做签名反射）"""
+    return frozenset(p for p in inspect.signature(func).parameters if p != "self")
+
+
+@functools.lru_cache(maxsize=None)
+def _handler_required_params(func):
+    """工具处理函数中没有默认值的必填参数名（保持声明顺序）"""
+    return tuple(
+        name for name, p in inspect.signature(func).parameters.items()
+        if name != "self" and p.default is inspect.Parameter.empty
+        and p.kind in (inspect.Parameter.POSITIONAL_OR_KEYWORD, inspect.Parameter.KEYWORD_ONLY)
+    )
+
+
+@functools.lru_cache(maxsize=256)
+def _parse_dt(s):
+    """解析 "YYYY-MM-DD" 或 "YYYY-MM-DD HH:MM" 格式的时间字符串（LLM常重复给出相同时间，结果缓存）"""
+    try:
+        return datetime.fromisoformat(s.replace(" ", "T"))
+    except ValueError:
+        # fromisoformat要求补零，"2025-10-8 9:00" 这类写法交给strptime处理
+        for fmt in ("%Y-%m-%d %H:%M", "%Y-%m-%d"):
+            try:
+                return datetime.strptime(s, fmt)
+            except ValueError:
+                continue
+        raise
+
+
 class StockAnalysisPDFAgent:
     """股票分析PDF生成器 - 纯内存操作"""
 
+    # 类变量，浏览器实例在所有报告之间共享，避免每次重新启动Chrome
+    _pw = None
+    _browser = None
+    # 防止并发报告（或预热与渲染）同时启动多个Chrome
+    _browser_lock = asyncio.Lock()
+    # 同时渲染PDF的上下文数上限，可通过环境变量 PDF_CONCURRENCY 调整
+    _render_sem = asyncio.Semaphore(int(os.environ.get("PDF_CONCURRENCY", "4")))
+
+    # 渲染PDF时拦截的资源类型，样式表保留以免影响报告排版
+    BLOCKED_RESOURCE_TYPES = {"image", "font", "media", "other"}
+
+    # 报告磁盘缓存：同一股票在同一小时内直接复用已生成的PDF
+    PDF_CACHE_DIR = os.environ.get("STOCK_PDF_CACHE_DIR", "/tmp/stock_pdf_cache")
+    PDF_CACHE_TTL = 3600
+    _pdf_cache = DiskCache(PDF_CACHE_DIR, PDF_CACHE_TTL, ".pdf")
+
     def __init__(self):
-        # 豆包客户端配置 - 使用安全的初始化方式
-        self.doubao_client = create_openai_client()
+        # 豆包客户端配置 - 复用进程内共享的异步客户端
+        self.doubao_client = get_async_doubao_client()
         self.model_id = "bot-20250907084333-cbvff"
 
         # 系统提示词 - AI金融分析师角色
@@ -84,167 +233,370 @@ HTML格式要求：
 - 适当使用图表和表格展示数据
 - 确保响应式设计，适应PDF输出
 - 报告需要美观和简洁
+- 所有样式使用内联<style>标签，不要引用外部CSS、字体或图片资源
 
 重要：直接输出完整的HTML代码，不要包含任何代码块标记（如```html或```）"""
 
     def clean_html_content(self, html_content):
         """清理HTML内容中的代码块标记和其他不需要的字符"""
-        print("🧹 清理HTML内容中的代码块标记...")
+        logger.debug("🧹 清理HTML内容中的代码块标记...")
 
-        # 移除代码块标记
-        cleaned_content = re.sub(r'^```html\s*', '', html_content)
-        cleaned_content = re.sub(r'\s*```$', '', cleaned_content)
-        cleaned_content = cleaned_content.replace('```html', '').replace('```', '')
+        # 提示词要求不带代码块标记，多数情况下无需跑正则
+        if "```" not in html_content:
+            return html_content
 
-        print(f"✅ HTML内容清理完成，长度: {len(cleaned_content)} 字符")
-        return cleaned_content
+        # 移除代码块标记（一次扫描完成）
+        cleaned_content = _CODEFENCE_RE.sub('', html_content)
 
-    def get_html_from_doubao(self, stock_name_or_code):
-        """从豆包获取股票分析HTML报告"""
-        print(f"📝 请求豆包生成 {stock_name_or_code} 的股票分析报告...")
+        logger.debug("✅ HTML内容清理完成，长度: %s 字符", len(cleaned_content))
+        return cleaned_content
 
+    async def _stream_html_from_doubao(self, stock_name_or_code):
+        """以流式方式调用豆包，逐块拼接HTML内容"""
         user_prompt = f"请为股票 '{stock_name_or_code}' 生成一份完整的专业股票分析报告。"
 
+        response = await self.doubao_client.chat.completions.create(
+            model=self.model_id,
+            messages=[
+                {"role": "system", "content": self.system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            max_tokens=15000,
+            temperature=0.3,
+            stream=True
+        )
+
+        html_parts = []
+        tail = ""
+        async for chunk in response:
+            if chunk.choices:
+                delta = chunk.choices[0].delta.content or ""
+                html_parts.append(delta)
+                # 文档结束标签出现后立即停止，不再等待模型在HTML之后追加的说明文字
+                window = tail + delta
+                if "</html>" in window.lower():
+                    await response.response.aclose()
+                    break
+                # 只保留末尾一小段，用于识别跨块拆开的结束标签
+                tail = window[-32:]
+
+        html_content = "".join(html_parts)
+        end = html_content.lower().rfind("</html>")
+        if end != -1:
+            html_content = html_content[:end + len("</html>")]
+        return html_content.strip()
+
+    async def get_html_from_doubao(self, stock_name_or_code):
+        """从豆包获取股票分析HTML报告（流式）"""
+        logger.debug("📝 请求豆包生成 %s 的股票分析报告...", stock_name_or_code)
+
         try:
-            response = self.doubao_client.chat.completions.create(
-                model=self.model_id,
-                messages=[
-                    {"role": "system", "content": self.system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                max_tokens=15000,
-                temperature=0.3
-            )
-            html_content = response.choices[0].message.content.strip()
-            print(f"✅ 生成HTML报告（{len(html_content)} 字符）")
+            html_content = await self._stream_html_from_doubao(stock_name_or_code)
+            logger.debug("✅ 生成HTML报告（%s 字符）", len(html_content))
 
             # 清理HTML内容
             cleaned_html = self.clean_html_content(html_content)
             return cleaned_html
 
         except Exception as e:
-            print(f"❌ 豆包调用失败: {str(e)}")
+            logger.error("❌ 豆包调用失败: %s", e)
             # 如果是API错误，可能有更详细的错误信息
             if hasattr(e, 'response'):
-                print(f"🔧 API响应详情: {e.response}")
+                logger.debug("🔧 API响应详情: %s", e.response)
             return None
 
-    async def html_to_pdf(self, html_content):
+    async def _prewarm_browser(self):
+        """在等待豆包输出的同时提前启动浏览器"""
+        try:
+            await self.get_browser()
+        except Exception as e:
+            # 预热失败不影响主流程，html_to_pdf会再次尝试启动
+            logger.warning("⚠️ 浏览器预热失败: %s", e)
+
+    async def get_browser(self):
+        """获取共享的Chrome浏览器实例，首次调用时启动，之后所有报告复用"""
+        cls = StockAnalysisPDFAgent
+        if cls._browser is not None and cls._browser.is_connected():
+            return cls._browser
+
+        async with cls._browser_lock:
+            # 等锁期间可能已由其他协程启动完成
+            if cls._browser is not None and cls._browser.is_connected():
+                return cls._browser
+            if cls._pw is None:
+                # 延迟导入playwright，不生成PDF的请求无需加载
+                from playwright.async_api import async_playwright
+                cls._pw = await async_playwright().start()
+            # 使用系统安装的Chrome
+            logger.debug("🚀 启动系统Chrome浏览器...")
+            cls._browser = await cls._pw.chromium.launch(
+                executable_path="/usr/bin/google-chrome-stable",
+                headless=True,
+                args=[
+                    '--no-sandbox',
+                    '--disable-dev-shm-usage',
+                    '--disable-gpu',
+                    '--disable-software-rasterizer',
+                    '--disable-extensions',
+                    '--disable-background-timer-throttling',
+                    '--disable-renderer-backgrounding',
+                    '--disable-backgrounding-occluded-windows',
+                    '--disable-client-side-phishing-detection',
+                    '--disable-crash-reporter',
+                    '--disable-oopr-debug-crash-dump',
+                    '--no-first-run',
+                    '--memory-pressure-off'  # 禁用内存压力监控
+                ]
+            )
+        return cls._browser
+
+    async def _route_resource(self, route):
+        """拦截PDF渲染中不需要的资源请求"""
+        if route.request.resource_type in self.BLOCKED_RESOURCE_TYPES:
+            await route.abort()
+        else:
+            await route.continue_()
+
+    @classmethod
+    async def aclose(cls):
+        """关闭共享的浏览器实例（服务关闭时调用）"""
+        if cls._browser is not None:
+            try:
+                await cls._browser.close()
+            except Exception as e:
+                logger.error("❌ 关闭浏览器失败: %s", e)
+            cls._browser = None
+        if cls._pw is not None:
+            await cls._pw.stop()
+            cls._pw = None
+
+    async def html_to_pdf(self, html_content, out_path=None):
         """
         使用系统Chrome将HTML转换为PDF二进制数据
+
+        参数:
+        - out_path: 可选，指定后PDF直接写入该文件并返回文件路径，调用方不再持有整份PDF数据
         """
-        print("📄 启动系统Chrome，转换HTML为PDF...")
+        # 并发报告共用一个浏览器，同时渲染的上下文数受信号量限制
+        async with self._render_sem:
+            return await self._render_pdf(html_content, out_path)
 
+    async def _render_pdf(self, html_content, out_path=None):
+        """在独立的浏览器上下文中渲染一份PDF"""
+        logger.debug("📄 使用系统Chrome，转换HTML为PDF...")
+
+        context = None
         try:
-            async with async_playwright() as p:
-                # 使用系统安装的Chrome
-                print("🚀 启动系统Chrome浏览器...")
-                browser = await p.chromium.launch(
-                    executable_path="/usr/bin/google-chrome-stable",
-                    headless=True,
-                    args=[
-                        '--no-sandbox',
-                        '--disable-dev-shm-usage',
-                        '--disable-gpu',
-                        '--disable-software-rasterizer',
-                        '--disable-extensions',
-                        '--disable-background-timer-throttling',
-                        '--disable-renderer-backgrounding',
-                        '--disable-backgrounding-occluded-windows',
-                        '--disable-client-side-phishing-detection',
-                        '--disable-crash-reporter',
-                        '--disable-oopr-debug-crash-dump'
-                        '--no-first-run',
-                        '--single-process',  # 单进程模式，减少内存使用
-                        '--memory-pressure-off',  # 禁用内存压力监控
-                        '--no-zygote',
-                        '--max-old-space-size=1024'  # 限制Node.js内存使用（如果适用）
-                    ]
-                )
-
-                print("🌐 创建新页面...")
-                page = await browser.new_page()
-
-                # 设置页面尺寸为A4
-                await page.set_viewport_size({"width": 1200, "height": 1697})
-
-                print("📝 加载HTML内容...")
-                await page.set_content(html_content, wait_until='networkidle')
-
-                # 等待额外时间确保所有资源加载完成
-                await asyncio.sleep(2)
-
-                # 生成PDF二进制数据
-                print("🖨️ 生成PDF...")
-                pdf_options = {
-                    "format": 'A4',
-                    "print_background": True,
-                    "margin": {"top": "0.5in", "right": "0.5in", "bottom": "0.5in", "left": "0.5in"},
-                    "display_header_footer": False,
-                    "prefer_css_page_size": True
-                }
+            browser = await self.get_browser()
 
-                pdf_data = await page.pdf(**pdf_options)
-                await browser.close()
+            # 每份报告使用独立的上下文，页面尺寸为A4
+            logger.debug("🌐 创建新页面...")
+            context = await browser.new_context(viewport={"width": 1200, "height": 1697})
+            page = await context.new_page()
 
-                print(f"✅ PDF二进制数据生成成功，大小: {len(pdf_data)} 字节")
-                return pdf_data
+            # 拦截非必要的外部资源（图片、字体、媒体），避免等待CDN
+            await page.route("**/*", self._route_resource)
 
-        except Exception as e:
-            print(f"❌ PDF生成失败: {e}")
-            import traceback
-            print(f"📋 详细错误信息: {traceback.format_exc()}")
-            return None
+            logger.debug("📝 加载HTML内容...")
+            # HTML为内联字符串，DOM就绪即可，无需等待networkidle
+            await page.set_content(html_content, wait_until='domcontentloaded')
+
+            # 等待字体加载完成，避免PDF中出现回退字体；最多等2秒，字体迟迟未就绪也照常出PDF
+            try:
+                await asyncio.wait_for(page.evaluate("document.fonts.ready"), timeout=2.0)
+            except asyncio.TimeoutError:
+                logger.warning("⚠️ 等待字体加载超时，继续生成PDF")
+
+            # 生成PDF二进制数据
+            logger.debug("🖨️ 生成PDF...")
+            pdf_options = {
+                "format": 'A4',
+                "print_background": True,
+                "margin": {"top": "0.5in", "right": "0.5in", "bottom": "0.5in", "left": "0.5in"},
+                "display_header_footer": False,
+                "prefer_css_page_size": True
+            }
+
+            if out_path:
+                await page.pdf(path=out_path, **pdf_options)
+                logger.debug("✅ PDF已写入文件: %s", out_path)
+                return out_path
+
+            pdf_data = await page.pdf(**pdf_options)
 
-    async def generate_stock_report(self, stock_name_or_code):
-        """生成股票分析报告的主方法（异步版本）"""
-        print(f"🎯 开始生成 {stock_name_or_code} 的分析报告...")
+            logger.debug("✅ PDF二进制数据生成成功，大小: %s 字节", len(pdf_data))
+            return pdf_data
 
-        # 获取HTML内容
-        html_content = self.get_html_from_doubao(stock_name_or_code)
+        except Exception as e:
+            logger.error("❌ PDF生成失败: %s", e)
+            logger.debug("📋 详细错误信息", exc_info=True)
+            return None
+        finally:
+            # 只关闭本次的上下文，浏览器保留给后续报告复用
+            if context is not None:
+                await context.close()
+
+    def _pdf_cache_key(self, stock_name_or_code):
+        """缓存键为 (模型, 提示词, 股票, 北京时间的年月日时)，换模型或改提示词后旧报告自动失效"""
+        hour = datetime.now(_BEIJING_TZ).strftime('%Y%m%d%H')
+        return f"{self.model_id}|{self.system_prompt}|{stock_name_or_code.strip()}|{hour}"
+
+    def _load_cached_pdf(self, stock_name_or_code):
+        """读取缓存的PDF，未命中或已过期返回None"""
+        return self._pdf_cache.get(self._pdf_cache_key(stock_name_or_code))
+
+    def _save_cached_pdf(self, stock_name_or_code, pdf_binary):
+        """写入PDF缓存，过期文件的清理由DiskCache节流进行"""
+        self._pdf_cache.set(self._pdf_cache_key(stock_name_or_code), pdf_binary)
+
+    async def generate_stock_report(self, stock_name_or_code, out_path=None):
+        """生成股票分析报告的主方法（异步版本），指定out_path时返回PDF文件路径"""
+        logger.debug("🎯 开始生成 %s 的分析报告...", stock_name_or_code)
+
+        if not out_path:
+            cached_pdf = self._load_cached_pdf(stock_name_or_code)
+            if cached_pdf:
+                logger.debug("✅ 命中报告缓存: %s", stock_name_or_code)
+                return cached_pdf
+
+        # 获取HTML内容，同时预热浏览器，使Chrome启动不在关键路径上
+        html_content, _ = await asyncio.gather(
+            self.get_html_from_doubao(stock_name_or_code),
+            self._prewarm_browser()
+        )
         if html_content:
-            print(f"✅ 成功获取HTML内容，长度: {len(html_content)} 字符")
+            logger.debug("✅ 成功获取HTML内容，长度: %s 字符", len(html_content))
             # 转换为PDF二进制数据
-            pdf_binary = await self.html_to_pdf(html_content)
+            pdf_binary = await self.html_to_pdf(html_content, out_path=out_path)
             if pdf_binary:
-                print(f"✅ {stock_name_or_code} 分析报告生成成功！PDF大小: {len(pdf_binary)} 字节")
+                logger.debug("✅ %s 分析报告生成成功！", stock_name_or_code)
+                if not out_path:
+                    self._save_cached_pdf(stock_name_or_code, pdf_binary)
                 return pdf_binary
             else:
-                print(f"❌ {stock_name_or_code} PDF转换失败")
+                logger.error("❌ %s PDF转换失败", stock_name_or_code)
                 return None
         else:
-            print(f"❌ 无法获取 {stock_name_or_code} 的HTML内容，可能是豆包API调用失败")
+            logger.error("❌ 无法获取 %s 的HTML内容，可能是豆包API调用失败", stock_name_or_code)
             return None
 
+    async def generate_many(self, stock_names_or_codes, max_concurrency=4):
+        """
+        并发生成多只股票的分析报告
+
+        参数:
+        - stock_names_or_codes: 股票名称或代码列表
+        - max_concurrency: 同时生成的报告数量上限，避免触发豆包限流
+
+        返回:
+        - {股票: PDF二进制数据或None}
+        """
+        sem = asyncio.Semaphore(max_concurrency)
+
+        async def generate_one(stock_name_or_code):
+            async with sem:
+                return stock_name_or_code, await self.generate_stock_report(stock_name_or_code)
+
+        return dict(await asyncio.gather(*(generate_one(s) for s in stock_names_or_codes)))
+
+
+class _TokenBucket:
+    """线程安全的令牌桶限流器：平均每秒rate个请求，最多允许capacity个突发"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """取一个令牌，令牌不足时阻塞等待"""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+def _ttl_cached_query(method):
+    """查询结果短时缓存：同一轮对话中重复的查询直接返回，过期时间见QUERY_CACHE_TTL"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        key = (method.__name__, args, tuple(sorted(kwargs.items())))
+        cached = self._query_cache.get(key)
+        if cached and time.monotonic() - cached[0] < self.QUERY_CACHE_TTL:
+            return cached[1]
+
+        result = method(self, *args, **kwargs)
+        if result.get("success"):
+            self._query_cache[key] = (time.monotonic(), result)
+        return result
+    return wrapper
+
+
+def _invalidates_query_cache(method):
+    """修改类操作执行后清空查询缓存，保证随后的查询看到最新数据"""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            self._query_cache.clear()
+    return wrapper
+
 
 class GoogleCalendarManager:
     """Google日历管理器 - 支持本地credentials.json认证"""
 
+    # 查询结果缓存时长（秒）
+    QUERY_CACHE_TTL = 5.0
+    # 进程内所有Google API请求共享的限流器（10次/秒，突发20次），只在接近配额时才等待
+    _google_bucket = _TokenBucket(rate=10, capacity=20)
+
+    # 任务优先级映射（类常量，避免每次调用重复构建）
+    _TASK_PRIORITY = {"low": "1", "medium": "3", "high": "5"}
+    _TASK_PRIORITY_INV = {v: k for k, v in _TASK_PRIORITY.items()}
+
     def __init__(self):
         # 权限范围 - 包含Tasks API
         self.SCOPES = [
             'https://www.googleapis.com/auth/calendar',
             'https://www.googleapis.com/auth/tasks'
         ]
-        self.beijing_tz = pytz.timezone('Asia/Shanghai')  # 北京时区
-        self.service = self._authenticate()
-        if self.service:
-            self.tasks_service = build('tasks', 'v1', credentials=self.service._http.credentials)
+        self.beijing_tz = _BEIJING_TZ  # 北京时区
+        self._default_task_list_id = None  # 缓存默认任务列表ID，避免重复请求
+        self._query_cache = {}  # (方法, 参数) -> (时间戳, 结果)
+        # 日历和任务服务共用同一份凭据，不再从服务的私有_http中取回
+        self._creds = self._authenticate()
+        if self._creds:
+            self.service = self._build_service('calendar', 'v3', self._creds)
+            self.tasks_service = self._build_service('tasks', 'v1', self._creds)
         else:
+            self.service = None
             self.tasks_service = None
 
     def _authenticate(self):
-        """Google日历认证 - 优先使用本地credentials.json"""
+        """Google日历认证 - 优先使用本地credentials.json，返回凭据，失败时返回None"""
+        # 延迟导入Google认证相关模块，只在首次使用日历/任务功能时加载
+        from google.auth.transport.requests import Request
+        from google.oauth2.credentials import Credentials
+
         creds = None
 
-        # 方案1: 从本地token.pickle文件加载（开发环境优先）
-        if os.path.exists('token.pickle'):
+        # 方案1: 从本地token.json文件加载（开发环境优先）
+        if os.path.exists('token.json'):
             try:
-                with open('token.pickle', 'rb') as token:
-                    creds = pickle.load(token)
-                print("✅ 从本地token.pickle加载令牌成功")
+                with open('token.json', 'r', encoding='utf-8') as token:
+                    creds = Credentials.from_authorized_user_info(json.load(token), self.SCOPES)
+                logger.debug("✅ 从本地token.json加载令牌成功")
             except Exception as e:
-                print(f"❌ 从token.pickle加载令牌失败: {e}")
+                logger.error("❌ 从token.json加载令牌失败: %s", e)
 
         # 方案2: 从环境变量加载令牌（生产环境）
         if not creds:
@@ -253,50 +605,79 @@ class GoogleCalendarManager:
                 try:
                     token_info = json.loads(token_json)
                     creds = Credentials.from_authorized_user_info(token_info, self.SCOPES)
-                    print("✅ 从环境变量加载令牌成功")
+                    logger.debug("✅ 从环境变量加载令牌成功")
                 except Exception as e:
-                    print(f"❌ 从环境变量加载令牌失败: {e}")
+                    logger.error("❌ 从环境变量加载令牌失败: %s", e)
 
         # 检查令牌有效性
         if creds and creds.expired and creds.refresh_token:
             try:
                 creds.refresh(Request())
-                print("✅ 令牌刷新成功")
+                logger.debug("✅ 令牌刷新成功")
             except Exception as e:
-                print(f"❌ 令牌刷新失败: {e}")
+                logger.error("❌ 令牌刷新失败: %s", e)
                 creds = None
 
         # 如果没有有效令牌，启动OAuth流程（使用本地credentials.json）
         if not creds:
-            print("🚀 启动本地OAuth授权流程...")
+            logger.debug("🚀 启动本地OAuth授权流程...")
             try:
+                from google_auth_oauthlib.flow import InstalledAppFlow
+
                 # 优先使用本地的credentials.json文件
                 if os.path.exists('credentials.json'):
                     flow = InstalledAppFlow.from_client_secrets_file(
                         'credentials.json', self.SCOPES)
                     creds = flow.run_local_server(port=0)
-                    print("✅ 使用credentials.json授权成功")
+                    logger.debug("✅ 使用credentials.json授权成功")
                 else:
                     # 备选方案：从环境变量构建配置
                     credentials_info = self._get_credentials_from_env()
                     flow = InstalledAppFlow.from_client_config(
                         credentials_info, self.SCOPES)
                     creds = flow.run_local_server(port=0)
-                    print("✅ 使用环境变量配置授权成功")
+                    logger.debug("✅ 使用环境变量配置授权成功")
 
                 # 保存令牌供后续使用
-                with open('token.pickle', 'wb') as token:
-                    pickle.dump(creds, token)
-                print("✅ OAuth授权成功，令牌已保存到token.pickle")
+                with open('token.json', 'w', encoding='utf-8') as token:
+                    token.write(creds.to_json())
+                logger.debug("✅ OAuth授权成功，令牌已保存到token.json")
 
             except Exception as e:
-                print(f"❌ OAuth授权失败: {e}")
-                print("💡 请确保：")
-                print("   1. 在项目根目录放置credentials.json文件")
-                print("   2. 或者在.env文件中配置GOOGLE_CLIENT_ID和GOOGLE_CLIENT_SECRET")
+                logger.error("❌ OAuth授权失败: %s", e)
+                logger.warning("💡 请确保：")
+                logger.warning("   1. 在项目根目录放置credentials.json文件")
+                logger.warning("   2. 或者在.env文件中配置GOOGLE_CLIENT_ID和GOOGLE_CLIENT_SECRET")
                 return None
 
-        return build('calendar', 'v3', credentials=creds)
+        return creds
+
+    def _build_service(self, service_name, version, creds):
+        """构建Google API服务 - 复用keep-alive连接，使用库内置的discovery文档，不发网络请求"""
+        from googleapiclient.discovery import build
+
+        return build(service_name, version, http=self._authorized_http(creds),
+                     cache_discovery=False, static_discovery=True)
+
+    @staticmethod
+    def _authorized_http(creds):
+        """创建带认证的httplib2连接（httplib2.Http不是线程安全的，并发请求需各自持有一个）"""
+        import httplib2
+        import google_auth_httplib2
+
+        http = httplib2.Http()
+        http.force_exception_to_status_code = True
+        authed_http = google_auth_httplib2.AuthorizedHttp(creds, http=http)
+
+        # 每个发往Google的HTTP请求先从令牌桶取令牌
+        send = authed_http.request
+
+        def rate_limited_request(*args, **kwargs):
+            GoogleCalendarManager._google_bucket.acquire()
+            return send(*args, **kwargs)
+
+        authed_http.request = rate_limited_request
+        return authed_http
 
     def _get_credentials_from_env(self):
         """从环境变量构建credentials字典（备用方案）"""
@@ -323,7 +704,7 @@ class GoogleCalendarManager:
             task_lists = self.tasks_service.tasklists().list().execute()
             return task_lists.get('items', [])
         except HttpError as error:
-            print(f"❌ 获取任务列表失败: {error}")
+            logger.error("❌ 获取任务列表失败: %s", error)
             return []
 
     def get_or_create_default_task_list(self):
@@ -331,21 +712,38 @@ class GoogleCalendarManager:
         if not self.tasks_service:
             return None
 
-        task_lists = self.get_task_lists()
+        if self._default_task_list_id:
+            return self._default_task_list_id
+
+        # 只需要第一个任务列表的ID，不拉取全部列表及其字段
+        try:
+            task_lists = self.tasks_service.tasklists().list(maxResults=1, fields='items(id)').execute().get('items', [])
+        except HttpError as error:
+            logger.error("❌ 获取任务列表失败: %s", error)
+            return None
+
         if task_lists:
-            # 返回第一个任务列表
-            return task_lists[0]['id']
+            # 使用第一个任务列表
+            self._default_task_list_id = task_lists[0]['id']
         else:
             # 创建新的任务列表
             try:
                 task_list = self.tasks_service.tasklists().insert(body={
                     'title': '智能助手任务'
                 }).execute()
-                return task_list['id']
+                self._default_task_list_id = task_list['id']
             except HttpError as error:
-                print(f"❌ 创建任务列表失败: {error}")
+                logger.error("❌ 创建任务列表失败: %s", error)
                 return None
 
+        return self._default_task_list_id
+
+    def _check_task_list_error(self, error):
+        """任务列表不存在（404）时清除缓存的任务列表ID"""
+        if error.resp.status == 404:
+            self._default_task_list_id = None
+
+    @_invalidates_query_cache
     def create_task(self, title, notes="", due_date=None, reminder_minutes=60, priority="medium"):
         """
         创建Google任务
@@ -364,9 +762,6 @@ class GoogleCalendarManager:
                     "error": "❌ 无法获取任务列表"
                 }
 
-            # 优先级映射
-            priority_map = {"low": "1", "medium": "3", "high": "5"}
-
             task_body = {
                 'title': title,
                 'notes': notes,
@@ -377,12 +772,12 @@ class GoogleCalendarManager:
             if due_date:
                 # 确保使用北京时区
                 if due_date.tzinfo is None:
-                    due_date = self.beijing_tz.localize(due_date)
+                    due_date = due_date.replace(tzinfo=self.beijing_tz)
                 # Google Tasks使用RFC 3339格式
                 task_body['due'] = due_date.isoformat()
 
             # 设置优先级
-            task_body['priority'] = priority_map.get(priority, "3")
+            task_body['priority'] = self._TASK_PRIORITY.get(priority, "3")
 
             task = self.tasks_service.tasks().insert(
                 tasklist=task_list_id,
@@ -396,11 +791,13 @@ class GoogleCalendarManager:
             }
 
         except HttpError as error:
+            self._check_task_list_error(error)
             return {
                 "success": False,
                 "error": f"❌ 创建任务失败: {error}"
             }
 
+    @_ttl_cached_query
     def query_tasks(self, show_completed=False, max_results=50):
         """
         查询任务
@@ -422,7 +819,9 @@ class GoogleCalendarManager:
             # 构建查询参数
             params = {
                 'tasklist': task_list_id,
-                'maxResults': max_results
+                'maxResults': max_results,
+                # 只返回需要的字段，减少响应体积
+                'fields': 'items(id,title,notes,due,priority,status,completed),nextPageToken'
             }
 
             if not show_completed:
@@ -439,33 +838,7 @@ class GoogleCalendarManager:
                     "message": "📭 没有找到任务"
                 }
 
-            formatted_tasks = []
-            for task in tasks:
-                # 处理截止日期
-                due_date = task.get('due')
-                if due_date:
-                    due_dt = datetime.fromisoformat(due_date.replace('Z', '+00:00'))
-                    due_beijing = due_dt.astimezone(self.beijing_tz)
-                    due_display = due_beijing.strftime('%Y-%m-%d %H:%M')
-                else:
-                    due_display = "无截止日期"
-
-                # 处理优先级
-                priority_map = {"1": "low", "3": "medium", "5": "high"}
-                priority = priority_map.get(task.get('priority', '3'), 'medium')
-
-                # 处理状态
-                status = "completed" if task.get('status') == 'completed' else "needsAction"
-
-                formatted_tasks.append({
-                    'id': task['id'],
-                    'title': task['title'],
-                    'notes': task.get('notes', ''),
-                    'due': due_display,
-                    'priority': priority,
-                    'status': status,
-                    'completed': task.get('completed') if status == "completed" else None
-                })
+            formatted_tasks = [self._format_task(task) for task in tasks]
 
             return {
                 "success": True,
@@ -475,11 +848,33 @@ class GoogleCalendarManager:
             }
 
         except HttpError as error:
+            self._check_task_list_error(error)
             return {
                 "success": False,
                 "error": f"❌ 查询任务失败: {error}"
             }
 
+    def _format_task(self, task):
+        """将Tasks API返回的原始任务转换为对外展示的字典"""
+        # 处理截止日期：Python 3.11 的 fromisoformat 可直接解析RFC3339的 'Z' 后缀
+        due_date = task.get('due')
+        if due_date:
+            due_display = datetime.fromisoformat(due_date).astimezone(self.beijing_tz).strftime('%Y-%m-%d %H:%M')
+        else:
+            due_display = "无截止日期"
+
+        completed = task.get('status') == 'completed'
+        return {
+            'id': task['id'],
+            'title': task['title'],
+            'notes': task.get('notes', ''),
+            'due': due_display,
+            'priority': self._TASK_PRIORITY_INV.get(task.get('priority', '3'), 'medium'),
+            'status': "completed" if completed else "needsAction",
+            'completed': task.get('completed') if completed else None
+        }
+
+    @_invalidates_query_cache
     def update_task_status(self, task_id, status="completed"):
         """
         更新任务状态
@@ -525,11 +920,13 @@ class GoogleCalendarManager:
             }
 
         except HttpError as error:
+            self._check_task_list_error(error)
             return {
                 "success": False,
                 "error": f"❌ 更新任务状态失败: {error}"
             }
 
+    @_invalidates_query_cache
     def delete_task(self, task_id):
         """删除任务"""
         if not self.tasks_service:
@@ -557,35 +954,78 @@ class GoogleCalendarManager:
             }
 
         except HttpError as error:
+            self._check_task_list_error(error)
             return {
                 "success": False,
                 "error": f"❌ 删除任务失败: {error}"
             }
 
+    def _batch_delete_tasks(self, task_ids):
+        """使用BatchHttpRequest批量删除任务，每批最多100个，返回成功删除的数量"""
+        task_list_id = self.get_or_create_default_task_list()
+        if not task_list_id:
+            return 0
+
+        return self._batch_delete(
+            self.tasks_service,
+            lambda task_id: self.tasks_service.tasks().delete(tasklist=task_list_id, task=task_id),
+            task_ids,
+            batch_size=100,
+            kind="任务"
+        )
+
+    def _list_tasks_raw(self, task_list_id, show_completed=True, fields="items(id,title)"):
+        """分页获取任务列表中的原始任务条目（不做格式化），返回所有页的items"""
+        params = {
+            'tasklist': task_list_id,
+            'maxResults': 100,
+            'fields': f"{fields},nextPageToken"
+        }
+        if not show_completed:
+            params['showCompleted'] = False
+            params['showHidden'] = False
+
+        items = []
+        while True:
+            tasks_result = self.tasks_service.tasks().list(**params).execute()
+            items.extend(tasks_result.get('items', []))
+            page_token = tasks_result.get('nextPageToken')
+            if not page_token:
+                return items
+            params['pageToken'] = page_token
+
+    @_invalidates_query_cache
     def delete_task_by_title(self, title_keyword, show_completed=True):
         """根据标题关键词删除任务"""
+        if not self.tasks_service:
+            return {
+                "success": False,
+                "error": "❌ 任务服务未初始化"
+            }
+
         try:
-            result = self.query_tasks(show_completed=show_completed, max_results=100)
-            if not result["success"]:
-                return result
+            task_list_id = self.get_or_create_default_task_list()
+            if not task_list_id:
+                return {
+                    "success": False,
+                    "error": "❌ 无法获取任务列表"
+                }
 
-            matching_tasks = []
-            for task in result["tasks"]:
-                if title_keyword.lower() in task['title'].lower():
-                    matching_tasks.append(task)
+            # 只取id和标题，遍历所有分页，不再受100条上限限制
+            keyword = title_keyword.lower()
+            matching_ids = [
+                task['id'] for task in self._list_tasks_raw(task_list_id, show_completed)
+                if keyword in task.get('title', '').lower()
+            ]
 
-            if not matching_tasks:
+            if not matching_ids:
                 return {
                     "success": False,
                     "error": f"❌ 未找到包含 '{title_keyword}' 的任务"
                 }
 
-            # 删除匹配的任务
-            deleted_count = 0
-            for task in matching_tasks:
-                delete_result = self.delete_task(task['id'])
-                if delete_result["success"]:
-                    deleted_count += 1
+            # 批量删除匹配的任务
+            deleted_count = self._batch_delete_tasks(matching_ids)
 
             return {
                 "success": True,
@@ -599,6 +1039,7 @@ class GoogleCalendarManager:
                 "error": f"❌ 删除任务时出错: {str(e)}"
             }
 
+    @_invalidates_query_cache
     def delete_tasks_by_time_range(self, start_date=None, end_date=None, show_completed=True):
         """
         根据时间范围批量删除任务
@@ -617,9 +1058,9 @@ class GoogleCalendarManager:
         try:
             # 解析日期参数
             if isinstance(start_date, str):
-                start_date = datetime.strptime(start_date, "%Y-%m-%d")
+                start_date = _parse_dt(start_date)
             if isinstance(end_date, str):
-                end_date = datetime.strptime(end_date, "%Y-%m-%d")
+                end_date = _parse_dt(end_date)
 
             # 如果没有指定结束日期，默认为开始日期后30天
             if start_date and not end_date:
@@ -635,32 +1076,24 @@ class GoogleCalendarManager:
 
             # 确保使用北京时区
             if start_date.tzinfo is None:
-                start_date = self.beijing_tz.localize(start_date)
+                start_date = start_date.replace(tzinfo=self.beijing_tz)
             if end_date.tzinfo is None:
-                end_date = self.beijing_tz.localize(end_date)
+                end_date = end_date.replace(tzinfo=self.beijing_tz)
 
-            # 获取所有任务
-            result = self.query_tasks(show_completed=show_completed, max_results=500)
-            if not result["success"]:
-                return result
+            task_list_id = self.get_or_create_default_task_list()
+            if not task_list_id:
+                return {
+                    "success": False,
+                    "error": "❌ 无法获取任务列表"
+                }
 
-            matching_tasks = []
-            for task in result["tasks"]:
-                # 检查任务是否有截止日期
-                if task['due'] != "无截止日期":
-                    try:
-                        # 解析任务的截止日期
-                        task_due = datetime.strptime(task['due'], '%Y-%m-%d %H:%M')
-                        task_due = self.beijing_tz.localize(task_due)
-
-                        # 检查任务是否在时间范围内
-                        if start_date <= task_due <= end_date:
-                            matching_tasks.append(task)
-                    except ValueError:
-                        # 如果日期解析失败，跳过这个任务
-                        continue
-
-            if not matching_tasks:
+            # 直接遍历原始任务（只取id和截止时间，覆盖所有分页），一次解析后与带时区的范围比较
+            matching_ids = [
+                task['id'] for task in self._list_tasks_raw(task_list_id, show_completed, fields="items(id,due)")
+                if task.get('due') and start_date <= datetime.fromisoformat(task['due']) <= end_date
+            ]
+
+            if not matching_ids:
                 start_str = start_date.strftime('%Y-%m-%d')
                 end_str = end_date.strftime('%Y-%m-%d')
                 return {
@@ -668,12 +1101,8 @@ class GoogleCalendarManager:
                     "error": f"❌ 在 {start_str} 到 {end_str} 范围内没有找到任务"
                 }
 
-            # 删除匹配的任务
-            deleted_count = 0
-            for task in matching_tasks:
-                delete_result = self.delete_task(task['id'])
-                if delete_result["success"]:
-                    deleted_count += 1
+            # 批量删除匹配的任务
+            deleted_count = self._batch_delete_tasks(matching_ids)
 
             start_str = start_date.strftime('%Y-%m-%d')
             end_str = end_date.strftime('%Y-%m-%d')
@@ -691,6 +1120,7 @@ class GoogleCalendarManager:
 
     # ========== 日历事件功能 ==========
 
+    @_invalidates_query_cache
     def create_event(self, summary, description="", start_time=None, end_time=None,
                      reminder_minutes=30, priority="medium", status="confirmed"):
         """
@@ -710,12 +1140,9 @@ class GoogleCalendarManager:
 
         # 如果传入的是naive datetime，转换为北京时区
         if start_time.tzinfo is None:
-            start_time = self.beijing_tz.localize(start_time)
+            start_time = start_time.replace(tzinfo=self.beijing_tz)
         if end_time.tzinfo is None:
-            end_time = self.beijing_tz.localize(end_time)
-
-        # 优先级映射
-        priority_map = {"low": "5", "medium": "3", "high": "1"}
+            end_time = end_time.replace(tzinfo=self.beijing_tz)
 
         event = {
             'summary': summary,
@@ -743,7 +1170,8 @@ class GoogleCalendarManager:
         }
 
         try:
-            event = self.service.events().insert(calendarId='primary', body=event).execute()
+            event = self._execute_with_backoff(
+                self.service.events().insert(calendarId='primary', body=event))
             return {
                 "success": True,
                 "event_id": event['id'],
@@ -756,6 +1184,7 @@ class GoogleCalendarManager:
                 "error": f"❌ 创建日历事件失败: {error}"
             }
 
+    @_ttl_cached_query
     def query_events(self, days=30, max_results=50):
         """
         查询未来一段时间内的日历事件 - 修复时区问题
@@ -775,14 +1204,16 @@ class GoogleCalendarManager:
         future_rfc3339 = future_beijing.isoformat()
 
         try:
-            events_result = self.service.events().list(
+            events_result = self._execute_with_backoff(self.service.events().list(
                 calendarId='primary',
                 timeMin=now_rfc3339,
                 timeMax=future_rfc3339,
                 maxResults=max_results,
                 singleEvents=True,
-                orderBy='startTime'
-            ).execute()
+                orderBy='startTime',
+                # 只返回需要的字段，减少响应体积
+                fields='items(id,summary,description,start,end,extendedProperties/private),nextPageToken'
+            ))
 
             events = events_result.get('items', [])
 
@@ -842,6 +1273,7 @@ class GoogleCalendarManager:
             "server_timezone": str(server_now.tzinfo) if server_now.tzinfo else "None (naive)"
         }
 
+    @_invalidates_query_cache
     def update_event_status(self, event_id, status="completed"):
         """更新事件状态"""
         if not self.service:
@@ -852,7 +1284,8 @@ class GoogleCalendarManager:
 
         try:
             # 先获取事件
-            event = self.service.events().get(calendarId='primary', eventId=event_id).execute()
+            event = self._execute_with_backoff(
+                self.service.events().get(calendarId='primary', eventId=event_id))
 
             # 更新状态
             if 'extendedProperties' not in event:
@@ -866,8 +1299,8 @@ class GoogleCalendarManager:
             if status == "completed":
                 event['summary'] = "✅ " + event.get('summary', '')
 
-            updated_event = self.service.events().update(
-                calendarId='primary', eventId=event_id, body=event).execute()
+            updated_event = self._execute_with_backoff(self.service.events().update(
+                calendarId='primary', eventId=event_id, body=event))
 
             return {
                 "success": True,
@@ -880,6 +1313,7 @@ class GoogleCalendarManager:
                 "error": f"❌ 更新事件状态失败: {error}"
             }
 
+    @_invalidates_query_cache
     def delete_event(self, event_id):
         """删除日历事件"""
         if not self.service:
@@ -889,7 +1323,8 @@ class GoogleCalendarManager:
             }
 
         try:
-            self.service.events().delete(calendarId='primary', eventId=event_id).execute()
+            self._execute_with_backoff(
+                self.service.events().delete(calendarId='primary', eventId=event_id))
             return {
                 "success": True,
                 "message": "🗑️ 日历事件已成功删除"
@@ -900,18 +1335,129 @@ class GoogleCalendarManager:
                 "error": f"❌ 删除日历事件失败: {error}"
             }
 
+    # 可重试的Google API状态码（限流和服务端错误）
+    RETRYABLE_STATUS = (429, 500, 503)
+    # 403中只有这些原因属于限流，可以重试；其余403（如无权限）直接失败
+    RATE_LIMIT_REASONS = frozenset({"rateLimitExceeded", "userRateLimitExceeded"})
+    MAX_RETRIES = 5
+    # 批量删除时同时在途的批次数
+    DELETE_CONCURRENCY = 5
+
+    def _backoff_sleep(self, attempt):
+        """指数退避 + 随机抖动"""
+        time.sleep((2 ** attempt) + random.random())
+
+    def _is_retryable(self, error):
+        """判断HttpError是否值得退避重试"""
+        if error.resp.status == 403:
+            try:
+                errors = json.loads(error.content.decode("utf-8"))["error"].get("errors", [])
+            except (ValueError, KeyError, AttributeError, TypeError):
+                return False
+            return any(e.get("reason") in self.RATE_LIMIT_REASONS for e in errors)
+        return error.resp.status in self.RETRYABLE_STATUS
+
+    def _execute_with_backoff(self, request, http=None):
+        """执行Google API请求，遇到限流或服务端错误时指数退避重试"""
+        for attempt in range(self.MAX_RETRIES + 1):
+            try:
+                return request.execute(http=http)
+            except HttpError as error:
+                if not self._is_retryable(error) or attempt == self.MAX_RETRIES:
+                    raise
+                logger.warning("⚠️ Google API返回 %s，第 %s 次重试...", error.resp.status, attempt + 1)
+                self._backoff_sleep(attempt)
+
+    def _batch_delete_events(self, event_ids):
+        """使用BatchHttpRequest批量删除日历事件，每批最多50个，返回成功删除的数量"""
+        return self._batch_delete(
+            self.service,
+            lambda event_id: self.service.events().delete(calendarId='primary', eventId=event_id),
+            event_ids,
+            batch_size=50,
+            kind="事件"
+        )
+
+    def _batch_delete(self, service, make_request, ids, batch_size, kind):
+        """
+        分批提交删除请求，被限流的子请求退避后重新提交，返回成功删除的数量
+
+        参数:
+        - service: 用于创建BatchHttpRequest的Google API服务
+        - make_request: 根据ID构建单个删除请求的函数
+        - batch_size: 每批的子请求数量上限
+        - kind: 日志中使用的对象名称
+        """
+        deleted = []
+        retry_ids = []
+
+        def on_deleted(request_id, response, exception):
+            if exception is None:
+                deleted.append(request_id)
+            elif isinstance(exception, HttpError) and self._is_retryable(exception):
+                retry_ids.append(request_id)
+            else:
+                logger.error("❌ 删除%s %s 失败: %s", kind, request_id, exception)
+
+        def run_batch(chunk, http=None):
+            batch = service.new_batch_http_request(callback=on_deleted)
+            for item_id in chunk:
+                batch.add(make_request(item_id), request_id=item_id)
+            self._execute_with_backoff(batch, http=http)
+
+        pending_ids = list(ids)
+        if not pending_ids:
+            return 0
+
+        for attempt in range(self.MAX_RETRIES + 1):
+            chunks = [pending_ids[i:i + batch_size] for i in range(0, len(pending_ids), batch_size)]
+            if len(chunks) == 1:
+                run_batch(chunks[0])
+            else:
+                # 多个批次并发提交，并发数受限以免触发429；每个批次使用独立的连接
+                with ThreadPoolExecutor(max_workers=self.DELETE_CONCURRENCY) as executor:
+                    list(executor.map(lambda chunk: run_batch(chunk, self._authorized_http(self._creds)), chunks))
+
+            if not retry_ids:
+                break
+            # 被限流的对象退避后重新提交
+            pending_ids, retry_ids[:] = list(retry_ids), []
+            if attempt == self.MAX_RETRIES:
+                logger.error("❌ %s 个%s重试后仍删除失败", len(pending_ids), kind)
+                break
+            self._backoff_sleep(attempt)
+
+        return len(deleted)
+
+    @_invalidates_query_cache
     def delete_event_by_summary(self, summary, days=30):
-        """根据事件标题删除事件（支持模糊匹配）"""
+        """根据事件标题删除事件（服务端全文检索缩小范围，再按标题确认）"""
+        if not self.service:
+            return {
+                "success": False,
+                "error": "❌ 日历服务未初始化"
+            }
+
         try:
-            # 先查询匹配的事件
-            result = self.query_events(days=days, max_results=100)
-            if not result["success"]:
-                return result
+            now_beijing = datetime.now(self.beijing_tz)
+            future_beijing = now_beijing + timedelta(days=days)
 
-            matching_events = []
-            for event in result["events"]:
-                if summary.lower() in event['summary'].lower():
-                    matching_events.append(event)
+            # q参数在服务端做全文检索（会同时匹配描述、地点、参会人），只拉取ID和标题
+            events_result = self._execute_with_backoff(self.service.events().list(
+                calendarId='primary',
+                q=summary,
+                timeMin=now_beijing.isoformat(),
+                timeMax=future_beijing.isoformat(),
+                singleEvents=True,
+                maxResults=250,
+                fields='items(id,summary)'
+            ))
+            # 只删除标题中包含关键词的事件，仅在描述等字段中提到的不删
+            keyword = summary.lower()
+            matching_events = [
+                event for event in events_result.get('items', [])
+                if keyword in event.get('summary', '').lower()
+            ]
 
             if not matching_events:
                 return {
@@ -919,12 +1465,8 @@ class GoogleCalendarManager:
                     "error": f"❌ 未找到包含 '{summary}' 的事件"
                 }
 
-            # 删除匹配的事件
-            deleted_count = 0
-            for event in matching_events:
-                delete_result = self.delete_event(event['id'])
-                if delete_result["success"]:
-                    deleted_count += 1
+            # 批量删除匹配的事件
+            deleted_count = self._batch_delete_events([event['id'] for event in matching_events])
 
             return {
                 "success": True,
@@ -938,6 +1480,7 @@ class GoogleCalendarManager:
                 "error": f"❌ 删除事件时出错: {str(e)}"
             }
 
+    @_invalidates_query_cache
     def delete_events_by_time_range(self, start_date=None, end_date=None):
         """
         根据时间范围批量删除日历事件
@@ -955,9 +1498,9 @@ class GoogleCalendarManager:
         try:
             # 解析日期参数
             if isinstance(start_date, str):
-                start_date = datetime.strptime(start_date, "%Y-%m-%d")
+                start_date = _parse_dt(start_date)
             if isinstance(end_date, str):
-                end_date = datetime.strptime(end_date, "%Y-%m-%d")
+                end_date = _parse_dt(end_date)
 
             # 如果没有指定结束日期，默认为开始日期后30天
             if start_date and not end_date:
@@ -973,49 +1516,43 @@ class GoogleCalendarManager:
 
             # 确保使用北京时区
             if start_date.tzinfo is None:
-                start_date = self.beijing_tz.localize(start_date)
+                start_date = start_date.replace(tzinfo=self.beijing_tz)
             if end_date.tzinfo is None:
-                end_date = self.beijing_tz.localize(end_date)
+                end_date = end_date.replace(tzinfo=self.beijing_tz)
 
-            # 转换为RFC3339格式
+            # 转换为RFC3339格式，提示信息用的日期字符串也只格式化一次
             start_rfc3339 = start_date.isoformat()
             end_rfc3339 = end_date.isoformat()
+            start_str = f"{start_date:%Y-%m-%d}"
+            end_str = f"{end_date:%Y-%m-%d}"
 
-            # 查询时间范围内的事件
-            events_result = self.service.events().list(
-                calendarId='primary',
-                timeMin=start_rfc3339,
-                timeMax=end_rfc3339,
-                maxResults=500,
-                singleEvents=True,
-                orderBy='startTime'
-            ).execute()
-
-            events = events_result.get('items', [])
+            # 分页查询时间范围内的事件，删除只需要事件ID
+            params = {
+                'calendarId': 'primary',
+                'timeMin': start_rfc3339,
+                'timeMax': end_rfc3339,
+                'maxResults': 2500,
+                'singleEvents': True,
+                'fields': 'items(id),nextPageToken'
+            }
+            events = []
+            while True:
+                events_result = self._execute_with_backoff(self.service.events().list(**params))
+                events.extend(events_result.get('items', []))
+                page_token = events_result.get('nextPageToken')
+                if not page_token:
+                    break
+                params['pageToken'] = page_token
 
             if not events:
-                start_str = start_date.strftime('%Y-%m-%d')
-                end_str = end_date.strftime('%Y-%m-%d')
                 return {
                     "success": False,
                     "error": f"❌ 在 {start_str} 到 {end_str} 范围内没有找到日历事件"
                 }
 
-            # 删除匹配的事件
-            deleted_count = 0
-            for event in events:
-                try:
-                    self.service.events().delete(
-                        calendarId='primary',
-                        eventId=event['id']
-                    ).execute()
-                    deleted_count += 1
-                except HttpError as error:
-                    print(f"❌ 删除事件 {event['id']} 失败: {error}")
-                    continue
+            # 批量删除匹配的事件
+            deleted_count = self._batch_delete_events([event['id'] for event in events])
 
-            start_str = start_date.strftime('%Y-%m-%d')
-            end_str = end_date.strftime('%Y-%m-%d')
             return {
                 "success": True,
                 "message": f"🗑️ 成功删除 {deleted_count} 个在 {start_str} 到 {end_str} 范围内的日历事件",
@@ -1029,22 +1566,15 @@ class GoogleCalendarManager:
             }
 
 
-class DeepseekAgent:
-    """智能助手Agent - 集成股票分析功能"""
-
-    def __init__(self):
-        # 使用安全的客户端初始化方式
-        self.client = create_openai_client()
-        self.model_id = "bot-20250907084333-cbvff"
+def _result_text(result, default):
+    """把日历管理器返回的结果字典转换为 (是否成功, 提示文本)"""
+    if result.get("success"):
+        return True, result.get("message", default)
+    return False, result.get("error", default)
 
-        # 初始化Google日历管理器
-        self.calendar_manager = GoogleCalendarManager()
 
-        # 初始化股票分析代理
-        self.stock_agent = StockAnalysisPDFAgent()
-
-        # 更新系统提示词 - 支持多个任务
-        self.system_prompt = """你是一个智能助手，具备工具调用能力。当用户请求涉及日历、任务、邮件或股票分析时，你需要返回JSON格式的工具调用。
+# 智能助手系统提示词 - 支持多个任务
+_SYSTEM_PROMPT = """你是一个智能助手，具备工具调用能力。当用户请求涉及日历、任务、邮件或股票分析时，你需要返回JSON格式的工具调用。
 
 重要更新：现在支持一次处理多个任务！当用户输入包含多个请求时，你需要返回一个JSON数组，包含多个工具调用。
 
@@ -1103,58 +1633,75 @@ AI：```json
 ```
 """
 
+
+class DeepseekAgent:
+    """智能助手Agent - 集成股票分析功能"""
+
+    # 股票报告PDF的进程内LRU缓存（类变量，所有请求共享）：(股票, 北京时间年月日时) -> PDF
+    _stock_cache = OrderedDict()
+    STOCK_CACHE_SIZE = 32
+
+    def __init__(self):
+        # 复用进程内共享的客户端
+        self.client = get_doubao_client()
+        self.model_id = "bot-20250907084333-cbvff"
+
+        self._dispatch = self._build_dispatch()
+
+        # Brevo邮件配置只读取一次
+        self._brevo_key = os.environ.get("BREVO_API_KEY")
+        self._brevo_sender = {
+            "name": os.environ.get("BREVO_SENDER_NAME", "智能助手"),
+            "email": os.environ.get("BREVO_SENDER_EMAIL")
+        }
+        self._brevo_headers = {
+            "accept": "application/json",
+            "content-type": "application/json",
+            "api-key": self._brevo_key
+        }
+
+        # 系统提示词为模块级常量，所有实例共享
+        self.system_prompt = _SYSTEM_PROMPT
+
+    @functools.cached_property
+    def calendar_manager(self):
+        """Google日历管理器（首次使用时才做OAuth认证）"""
+        return GoogleCalendarManager()
+
+    @functools.cached_property
+    def stock_agent(self):
+        """股票分析代理（首次使用时才创建）"""
+        return StockAnalysisPDFAgent()
+
     def send_email(self, to, subject, body):
         """发送邮件 - 使用 Brevo API"""
         if not all([to, subject, body]):
-            return "收件人、主题或正文不能为空"
+            return False, "收件人、主题或正文不能为空"
 
-        brevo_api_key = os.environ.get("BREVO_API_KEY")
-        sender_email = os.environ.get("BREVO_SENDER_EMAIL")
-        sender_name = os.environ.get("BREVO_SENDER_NAME", "智能助手")
-
-        if not brevo_api_key:
-            return "邮件服务未配置"
+        if not self._brevo_key:
+            return False, "邮件服务未配置"
 
         try:
             url = "https://api.brevo.com/v3/smtp/email"
 
             payload = {
-                "sender": {
-                    "name": sender_name,
-                    "email": sender_email
-                },
+                "sender": self._brevo_sender,
                 "to": [{"email": to}],
                 "subject": subject,
-                "htmlContent": f"""
-                <div style="font-family: Arial, sans-serif; line-height: 1.6;">
-                    <h2>{subject}</h2>
-                    <div style="white-space: pre-line; padding: 20px; background: #f9f9f9; border-radius: 5px;">
-                        {body}
-                    </div>
-                    <p style="color: #999; font-size: 12px; margin-top: 20px;">
-                        此邮件由智能助手自动发送
-                    </p>
-                </div>
-                """,
+                "htmlContent": _EMAIL_HTML_TPL.substitute(subject=subject, body=body),
                 "textContent": body
             }
 
-            headers = {
-                "accept": "application/json",
-                "content-type": "application/json",
-                "api-key": brevo_api_key
-            }
-
-            response = requests.post(url, json=payload, headers=headers, timeout=30)
+            response = get_brevo_session().post(url, json=payload, headers=self._brevo_headers, timeout=30)
 
             if response.status_code == 201:
-                return f"📧 邮件发送成功！已发送至：{to}"
+                return True, f"📧 邮件发送成功！已发送至：{to}"
             else:
                 error_data = response.json()
-                return f"❌ 邮件发送失败：{error_data.get('message', 'Unknown error')}"
+                return False, f"❌ 邮件发送失败：{error_data.get('message', 'Unknown error')}"
 
         except Exception as e:
-            return f"❌ 邮件发送异常：{str(e)}"
+            return False, f"❌ 邮件发送异常：{str(e)}"
 
 
     # ========== 股票分析功能 ==========
@@ -1169,20 +1716,32 @@ AI：```json
         返回:
         - PDF二进制数据，如果失败则返回None
         """
-        print(f"📈 开始生成股票分析报告: {stock_name}")
+        logger.info("📈 开始生成股票分析报告: %s", stock_name)
+
+        # 同一股票在同一小时内重复请求时直接返回内存中的PDF；
+        # 与磁盘缓存使用同一个键（模型、提示词、股票、小时），两层缓存的失效条件一致
+        cache_key = self.stock_agent._pdf_cache_key(stock_name)
+        cached = self._stock_cache.get(cache_key)
+        if cached:
+            self._stock_cache.move_to_end(cache_key)
+            logger.debug("✅ 命中股票报告内存缓存，大小: %s 字节", len(cached))
+            return cached
 
         try:
             pdf_binary = await self.stock_agent.generate_stock_report(stock_name)
             if pdf_binary:
-                print(f"✅ 股票分析报告生成成功，大小: {len(pdf_binary)} 字节")
+                logger.debug("✅ 股票分析报告生成成功，大小: %s 字节", len(pdf_binary))
+                self._stock_cache[cache_key] = pdf_binary
+                if len(self._stock_cache) > self.STOCK_CACHE_SIZE:
+                    self._stock_cache.popitem(last=False)
                 # 返回PDF二进制数据，用于后续上传或其他操作
                 return pdf_binary
             else:
-                print("❌ 股票分析报告生成失败")
+                logger.error("❌ 股票分析报告生成失败")
                 return None
 
         except Exception as e:
-            print(f"❌ 生成股票分析报告时出错: {e}")
+            logger.error("❌ 生成股票分析报告时出错: %s", e)
             return None
 
 
@@ -1191,14 +1750,14 @@ AI：```json
     def create_task(self, title, notes="", due_date=None, reminder_minutes=60, priority="medium"):
         """创建Google任务"""
         try:
-            print(f"📝 开始创建任务: {title}")
+            logger.debug("📝 开始创建任务: %s", title)
 
             # 解析时间字符串
             due_dt = None
             if due_date:
-                print(f"⏰ 解析截止时间: {due_date}")
-                due_dt = datetime.strptime(due_date, "%Y-%m-%d %H:%M")
-                print(f"✅ 时间解析成功: {due_dt}")
+                logger.debug("⏰ 解析截止时间: %s", due_date)
+                due_dt = _parse_dt(due_date)
+                logger.debug("✅ 时间解析成功: %s", due_dt)
 
             result = self.calendar_manager.create_task(
                 title=title,
@@ -1209,23 +1768,23 @@ AI：```json
             )
 
             if result.get("success"):
-                print(f"✅ 任务创建成功: {title}")
-                return result.get("message", f"✅ 任务 '{title}' 创建成功")
+                logger.debug("✅ 任务创建成功: %s", title)
+                return True, result.get("message", f"✅ 任务 '{title}' 创建成功")
             else:
                 error_msg = result.get("error", "创建任务失败")
-                print(f"❌ 任务创建失败: {error_msg}")
-                return f"❌ {error_msg}"
+                logger.error("❌ 任务创建失败: %s", error_msg)
+                return False, f"❌ {error_msg}"
 
         except Exception as e:
             error_msg = f"❌ 创建任务时出错: {str(e)}"
-            print(error_msg)
-            return error_msg
+            logger.error(error_msg)
+            return False, error_msg
 
 
     def query_tasks(self, show_completed=False, max_results=20):
         """查询任务"""
         try:
-            print(f"🔍 查询任务: show_completed={show_completed}")
+            logger.debug("🔍 查询任务: show_completed=%s", show_completed)
 
             result = self.calendar_manager.query_tasks(
                 show_completed=show_completed,
@@ -1234,68 +1793,68 @@ AI：```json
 
             if not result["success"]:
                 error_msg = result.get("error", "查询任务失败")
-                print(f"❌ 查询失败: {error_msg}")
-                return f"❌ {error_msg}"
+                logger.error("❌ 查询失败: %s", error_msg)
+                return False, f"❌ {error_msg}"
 
             if not result["tasks"]:
-                print("📭 没有找到任务")
-                return result["message"]
+                logger.debug("📭 没有找到任务")
+                return True, result["message"]
 
             # 格式化输出任务列表
             status_text = "所有" if show_completed else "待办"
-            tasks_text = f"📋 {status_text}任务列表 ({result['count']}个):\n\n"
+            parts = [f"📋 {status_text}任务列表 ({result['count']}个):\n\n"]
 
             for i, task in enumerate(result["tasks"], 1):
                 status_emoji = "✅" if task['status'] == "completed" else "⏳"
-                priority_emoji = {"low": "⚪", "medium": "🟡", "high": "🔴"}.get(task['priority'], '🟡')
+                priority_emoji = _PRIORITY_EMOJI.get(task['priority'], '🟡')
 
-                tasks_text += f"{i}. {status_emoji}{priority_emoji} {task['title']}\n"
-                tasks_text += f"   截止: {task['due']}\n"
+                parts.append(f"{i}. {status_emoji}{priority_emoji} {task['title']}\n")
+                parts.append(f"   截止: {task['due']}\n")
                 if task['notes']:
-                    tasks_text += f"   描述: {task['notes'][:50]}...\n"
-                tasks_text += f"   状态: {task['status']} | 优先级: {task['priority']}\n"
-                tasks_text += f"   ID: {task['id'][:8]}...\n\n"
+                    parts.append(f"   描述: {task['notes'][:50]}...\n")
+                parts.append(f"   状态: {task['status']} | 优先级: {task['priority']}\n")
+                parts.append(f"   ID: {task['id'][:8]}...\n\n")
 
-            print(f"✅ 找到 {len(result['tasks'])} 个任务")
-            return tasks_text
+            logger.debug("✅ 找到 %s 个任务", len(result['tasks']))
+            return True, "".join(parts)
 
         except Exception as e:
             error_msg = f"❌ 查询任务时出错: {str(e)}"
-            print(error_msg)
-            return error_msg
+            logger.error(error_msg)
+            return False, error_msg
 
 
     def update_task_status(self, task_id, status="completed"):
         """更新任务状态"""
         try:
             result = self.calendar_manager.update_task_status(task_id, status)
-            return result.get("message", result.get("error", "状态更新完成"))
+            return _result_text(result, "状态更新完成")
         except Exception as e:
-            return f"❌ 更新任务状态时出错: {str(e)}"
+            return False, f"❌ 更新任务状态时出错: {str(e)}"
 
 
     def delete_task(self, task_id):
         """删除任务（通过任务ID）"""
         try:
             result = self.calendar_manager.delete_task(task_id)
-            return result.get("message", result.get("error", "删除完成"))
+            return _result_text(result, "删除完成")
         except Exception as e:
-            return f"❌ 删除任务时出错: {str(e)}"
+            return False, f"❌ 删除任务时出错: {str(e)}"
 
 
     def delete_task_by_title(self, title_keyword):
         """根据标题删除任务"""
         try:
             result = self.calendar_manager.delete_task_by_title(title_keyword)
-            return result.get("message", result.get("error", "删除完成"))
+            return _result_text(result, "删除完成")
         except Exception as e:
-            return f"❌ 按标题删除任务时出错: {str(e)}"
+            return False, f"❌ 按标题删除任务时出错: {str(e)}"
 
 
     def delete_tasks_by_time_range(self, start_date=None, end_date=None, show_completed=True):
         """按时间范围批量删除任务"""
         try:
-            print(f"🗑️ 按时间范围删除任务: {start_date} 到 {end_date}")
+            logger.debug("🗑️ 按时间范围删除任务: %s 到 %s", start_date, end_date)
 
             result = self.calendar_manager.delete_tasks_by_time_range(
                 start_date=start_date,
@@ -1304,33 +1863,33 @@ AI：```json
             )
 
             if result.get("success"):
-                print(f"✅ 时间范围删除任务成功")
-                return result.get("message", "✅ 时间范围删除任务完成")
+                logger.debug("✅ 时间范围删除任务成功")
+                return True, result.get("message", "✅ 时间范围删除任务完成")
             else:
                 error_msg = result.get("error", "时间范围删除任务失败")
-                print(f"❌ 时间范围删除任务失败: {error_msg}")
-                return f"❌ {error_msg}"
+                logger.error("❌ 时间范围删除任务失败: %s", error_msg)
+                return False, f"❌ {error_msg}"
 
         except Exception as e:
             error_msg = f"❌ 按时间范围删除任务时出错: {str(e)}"
-            print(error_msg)
-            return error_msg
+            logger.error(error_msg)
+            return False, error_msg
 
 
     def create_event(self, summary, description="", start_time=None, end_time=None,
                      reminder_minutes=30, priority="medium"):
         """创建Google日历事件"""
         try:
-            print(f"📅 开始创建日历事件: {summary}")
+            logger.debug("📅 开始创建日历事件: %s", summary)
 
             # 解析时间字符串
             start_dt = None
             end_dt = None
 
             if start_time:
-                start_dt = datetime.strptime(start_time, "%Y-%m-%d %H:%M")
+                start_dt = _parse_dt(start_time)
             if end_time:
-                end_dt = datetime.strptime(end_time, "%Y-%m-%d %H:%M")
+                end_dt = _parse_dt(end_time)
 
             result = self.calendar_manager.create_event(
                 summary=summary,
@@ -1342,17 +1901,17 @@ AI：```json
             )
 
             if result.get("success"):
-                print(f"✅ 日历事件创建成功: {summary}")
-                return result.get("message", f"✅ 日历事件 '{summary}' 创建成功")
+                logger.debug("✅ 日历事件创建成功: %s", summary)
+                return True, result.get("message", f"✅ 日历事件 '{summary}' 创建成功")
             else:
                 error_msg = result.get("error", "创建日历事件失败")
-                print(f"❌ 日历事件创建失败: {error_msg}")
-                return f"❌ {error_msg}"
+                logger.error("❌ 日历事件创建失败: %s", error_msg)
+                return False, f"❌ {error_msg}"
 
         except Exception as e:
             error_msg = f"❌ 创建日历事件时出错: {str(e)}"
-            print(error_msg)
-            return error_msg
+            logger.error(error_msg)
+            return False, error_msg
 
 
     def query_events(self, days=30, max_results=20):
@@ -1361,48 +1920,45 @@ AI：```json
             result = self.calendar_manager.query_events(days=days, max_results=max_results)
 
             if not result["success"]:
-                return result["error"]
+                return False, result["error"]
 
-            if not result["events"]:
-                return result["message"]
-
-            return result["message"]
+            return True, result["message"]
 
         except Exception as e:
-            return f"❌ 查询日历事件时出错: {str(e)}"
+            return False, f"❌ 查询日历事件时出错: {str(e)}"
 
 
     def update_event_status(self, event_id, status="completed"):
         """更新事件状态"""
         try:
             result = self.calendar_manager.update_event_status(event_id, status)
-            return result.get("message", result.get("error", "状态更新完成"))
+            return _result_text(result, "状态更新完成")
         except Exception as e:
-            return f"❌ 更新事件状态时出错: {str(e)}"
+            return False, f"❌ 更新事件状态时出错: {str(e)}"
 
 
     def delete_event(self, event_id):
         """删除日历事件"""
         try:
             result = self.calendar_manager.delete_event(event_id)
-            return result.get("message", result.get("error", "删除完成"))
+            return _result_text(result, "删除完成")
         except Exception as e:
-            return f"❌ 删除日历事件时出错: {str(e)}"
+            return False, f"❌ 删除日历事件时出错: {str(e)}"
 
 
     def delete_event_by_summary(self, summary, days=30):
         """根据标题删除日历事件"""
         try:
             result = self.calendar_manager.delete_event_by_summary(summary, days)
-            return result.get("message", result.get("error", "删除完成"))
+            return _result_text(result, "删除完成")
         except Exception as e:
-            return f"❌ 按标题删除事件时出错: {str(e)}"
+            return False, f"❌ 按标题删除事件时出错: {str(e)}"
 
 
     def delete_events_by_time_range(self, start_date=None, end_date=None):
         """按时间范围批量删除日历事件"""
         try:
-            print(f"🗑️ 按时间范围删除日历事件: {start_date} 到 {end_date}")
+            logger.debug("🗑️ 按时间范围删除日历事件: %s 到 %s", start_date, end_date)
 
             result = self.calendar_manager.delete_events_by_time_range(
                 start_date=start_date,
@@ -1410,41 +1966,55 @@ AI：```json
             )
 
             if result.get("success"):
-                print(f"✅ 时间范围删除日历事件成功")
-                return result.get("message", "✅ 时间范围删除日历事件完成")
+                logger.debug("✅ 时间范围删除日历事件成功")
+                return True, result.get("message", "✅ 时间范围删除日历事件完成")
             else:
                 error_msg = result.get("error", "时间范围删除日历事件失败")
-                print(f"❌ 时间范围删除日历事件失败: {error_msg}")
-                return f"❌ {error_msg}"
+                logger.error("❌ 时间范围删除日历事件失败: %s", error_msg)
+                return False, f"❌ {error_msg}"
 
         except Exception as e:
             error_msg = f"❌ 按时间范围删除日历事件时出错: {str(e)}"
-            print(error_msg)
-            return error_msg
+            logger.error(error_msg)
+            return False, error_msg
 
 
     def extract_tool_calls(self, llm_response):
         """从LLM响应中提取工具调用指令 - 支持多个工具调用"""
-        print(f"🔍 解析LLM响应: {llm_response}")
+        logger.debug("🔍 解析LLM响应: %s", llm_response)
+
+        # 快速路径：模型直接返回裸JSON时无需扫描代码块
+        json_str = None
+        parsed_data = None
+        stripped = llm_response.strip()
+        if stripped[:1] in ("[", "{"):
+            try:
+                parsed_data = orjson.loads(stripped)
+                json_str = stripped
+            except orjson.JSONDecodeError:
+                # 以括号开头但不是JSON（如"[提示] ..."），退回到代码块扫描
+                pass
+
+        if json_str is None:
+            match = _JSON_BLOCK_RE.search(llm_response)
+            json_str = match.group(1) if match else None
 
-        if "```json" in llm_response and "```" in llm_response:
+        if json_str:
             try:
-                start = llm_response.find("```json") + 7
-                end = llm_response.find("```", start)
-                json_str = llm_response[start:end].strip()
-                print(f"📦 提取到JSON代码块: {json_str}")
+                logger.debug("📦 提取到JSON代码块: %s", json_str)
 
-                # 尝试解析为JSON
-                parsed_data = json.loads(json_str)
+                # 尝试解析为JSON（快速路径已解析过的直接复用）
+                if parsed_data is None:
+                    parsed_data = orjson.loads(json_str)
 
                 # 检查是单个工具调用还是多个工具调用
                 if isinstance(parsed_data, dict):
                     # 单个工具调用
                     if "action" in parsed_data and "parameters" in parsed_data:
-                        print(f"✅ 成功解析单个工具调用: {parsed_data['action']}")
+                        logger.debug("✅ 成功解析单个工具调用: %s", parsed_data['action'])
                         return [parsed_data]
                     else:
-                        print("❌ 单个工具调用格式不正确")
+                        logger.error("❌ 单个工具调用格式不正确")
                         return None
                 elif isinstance(parsed_data, list):
                     # 多个工具调用
@@ -1452,156 +2022,132 @@ AI：```json
                     for tool_data in parsed_data:
                         if isinstance(tool_data, dict) and "action" in tool_data and "parameters" in tool_data:
                             valid_tools.append(tool_data)
-                            print(f"✅ 成功解析工具调用: {tool_data['action']}")
+                            logger.debug("✅ 成功解析工具调用: %s", tool_data['action'])
                         else:
-                            print(f"❌ 工具调用格式不正确: {tool_data}")
+                            logger.error("❌ 工具调用格式不正确: %s", tool_data)
 
                     if valid_tools:
-                        print(f"✅ 成功解析 {len(valid_tools)} 个工具调用")
+                        logger.debug("✅ 成功解析 %s 个工具调用", len(valid_tools))
                         return valid_tools
                     else:
-                        print("❌ 没有有效的工具调用")
+                        logger.error("❌ 没有有效的工具调用")
                         return None
                 else:
-                    print("❌ JSON格式不正确")
+                    logger.error("❌ JSON格式不正确")
                     return None
 
-            except json.JSONDecodeError as e:
-                print(f"❌ JSON解析失败: {e}")
+            except orjson.JSONDecodeError as e:
+                logger.error("❌ JSON解析失败: %s", e)
                 return None
             except Exception as e:
-                print(f"❌ 提取工具调用失败: {e}")
+                logger.error("❌ 提取工具调用失败: %s", e)
                 return None
 
-        print("❌ 未找到有效的工具调用")
+        logger.debug("💬 未找到有效的工具调用")
         return None
 
 
+    async def _stock_report_tool(self, stock_name=""):
+        """股票分析工具：返回包含PDF二进制数据的结果字典"""
+        pdf_binary = await self.generate_stock_report(stock_name)
+        if pdf_binary:
+            return {
+                "success": True,
+                "pdf_binary": pdf_binary,
+                "message": f"✅ 股票分析报告生成成功，PDF大小: {len(pdf_binary)} 字节",
+                "stock_name": stock_name
+            }
+        return {
+            "success": False,
+            "error": "❌ 股票分析报告生成失败"
+        }
+
+    async def _news_report_tool(self):
+        """科技新闻工具：返回包含PDF二进制数据的结果字典"""
+        # 延迟导入，避免启动时加载reportlab等模块
+        import tech_news
+        _, pdf_binary, _ = await tech_news.generate_tech_news_report()
+        if pdf_binary:
+            return {
+                "success": True,
+                "pdf_binary": pdf_binary,
+                "message": f"✅ 科技新闻报告生成成功，PDF大小: {len(pdf_binary)} 字节"
+            }
+        return {
+            "success": False,
+            "error": "❌ 科技新闻报告生成失败"
+        }
+
+    def _build_dispatch(self):
+        """工具分发表：action -> (处理函数, 是否异步, 是否访问Google API)"""
+        return {
+            "create_task": (self.create_task, False, True),
+            "query_tasks": (self.query_tasks, False, True),
+            "update_task_status": (self.update_task_status, False, True),
+            "delete_task": (self.delete_task, False, True),
+            "delete_task_by_title": (self.delete_task_by_title, False, True),
+            "delete_tasks_by_time_range": (self.delete_tasks_by_time_range, False, True),
+            "create_event": (self.create_event, False, True),
+            "query_events": (self.query_events, False, True),
+            "update_event_status": (self.update_event_status, False, True),
+            "delete_event": (self.delete_event, False, True),
+            "delete_event_by_summary": (self.delete_event_by_summary, False, True),
+            "delete_events_by_time_range": (self.delete_events_by_time_range, False, True),
+            "send_email": (self.send_email, False, False),
+            "generate_stock_report": (self._stock_report_tool, True, False),
+            "generate_news_report": (self._news_report_tool, True, False),
+        }
+
     async def call_tool(self, action, parameters):
-        """统一工具调用入口 - 异步版本"""
-        print(f"🛠️ 调用工具: {action}")
-        print(f"📋 工具参数: {parameters}")
+        """
+        统一工具调用入口 - 异步版本，同步工具在线程中执行，不阻塞事件循环
+
+        返回:
+        - 同步工具: (是否成功, 提示文本)
+        - PDF工具: 包含success/pdf_binary/message的结果字典
+        """
+        logger.info("🛠️ 调用工具: %s", action)
+        logger.debug("📋 工具参数: %s", parameters)
+
+        handler, is_async, _ = self._dispatch.get(action, (None, False, False))
+        if handler is None:
+            logger.error("❌ 未知工具: %s", action)
+            return False, f"未知工具：{action}"
+
+        # 只传递处理函数声明过的参数，忽略LLM多给的字段
+        allowed = _handler_params(handler.__func__)
+        parameters = parameters or {}
+        kwargs = {k: v for k, v in parameters.items() if k in allowed}
+        rejected = [k for k in parameters if k not in allowed]
+        missing = [k for k in _handler_required_params(handler.__func__) if k not in kwargs]
+
+        if missing:
+            # 明确指出缺少和无法识别的参数名，便于后续总结时让用户或LLM修正
+            error_msg = f"❌ 工具 {action} 缺少必填参数: {', '.join(missing)}"
+            if rejected:
+                error_msg += f"；无法识别的参数: {', '.join(rejected)}"
+            logger.error(error_msg)
+            return False, error_msg
+        if rejected:
+            logger.warning("⚠️ 工具 %s 忽略无法识别的参数: %s", action, ", ".join(rejected))
 
         try:
-            if action == "create_task":
-                result = self.create_task(
-                    title=parameters.get("title", ""),
-                    notes=parameters.get("notes", ""),
-                    due_date=parameters.get("due_date"),
-                    reminder_minutes=parameters.get("reminder_minutes", 60),
-                    priority=parameters.get("priority", "medium")
-                )
-                print(f"📝 创建任务结果: {result}")
-                return result
-            elif action == "query_tasks":
-                return self.query_tasks(
-                    show_completed=parameters.get("show_completed", False),
-                    max_results=parameters.get("max_results", 20)
-                )
-            elif action == "update_task_status":
-                return self.update_task_status(
-                    task_id=parameters.get("task_id", ""),
-                    status=parameters.get("status", "completed")
-                )
-            elif action == "delete_task":
-                return self.delete_task(
-                    task_id=parameters.get("task_id", "")
-                )
-            elif action == "delete_task_by_title":
-                return self.delete_task_by_title(
-                    title_keyword=parameters.get("title_keyword", "")
-                )
-            elif action == "delete_tasks_by_time_range":
-                return self.delete_tasks_by_time_range(
-                    start_date=parameters.get("start_date"),
-                    end_date=parameters.get("end_date"),
-                    show_completed=parameters.get("show_completed", True)
-                )
-            elif action == "create_event":
-                return self.create_event(
-                    summary=parameters.get("summary", ""),
-                    description=parameters.get("description", ""),
-                    start_time=parameters.get("start_time"),
-                    end_time=parameters.get("end_time"),
-                    reminder_minutes=parameters.get("reminder_minutes", 30),
-                    priority=parameters.get("priority", "medium")
-                )
-            elif action == "query_events":
-                return self.query_events(
-                    days=parameters.get("days", 30),
-                    max_results=parameters.get("max_results", 20)
-                )
-            elif action == "update_event_status":
-                return self.update_event_status(
-                    event_id=parameters.get("event_id", ""),
-                    status=parameters.get("status", "completed")
-                )
-            elif action == "delete_event":
-                return self.delete_event(
-                    event_id=parameters.get("event_id", "")
-                )
-            elif action == "delete_event_by_summary":
-                return self.delete_event_by_summary(
-                    summary=parameters.get("summary", ""),
-                    days=parameters.get("days", 30)
-                )
-            elif action == "delete_events_by_time_range":
-                return self.delete_events_by_time_range(
-                    start_date=parameters.get("start_date"),
-                    end_date=parameters.get("end_date")
-                )
-            elif action == "generate_stock_report":
-                # 股票分析工具返回PDF二进制数据
-                pdf_binary = await self.generate_stock_report(parameters.get("stock_name", ""))
-                if pdf_binary:
-                    return {
-                        "success": True,
-                        "pdf_binary": pdf_binary,
-                        "message": f"✅ 股票分析报告生成成功，PDF大小: {len(pdf_binary)} 字节",
-                        "stock_name": parameters.get("stock_name", "")
-                    }
-                else:
-                    return {
-                        "success": False,
-                        "error": "❌ 股票分析报告生成失败"
-                    }
-            elif action == "generate_news_report":
-                # 科技新闻分析工具返回PDF二进制数据
-                _, pdf_binary, _ = await tech_news.generate_tech_news_report()
-                if pdf_binary:
-                    return {
-                        "success": True,
-                        "pdf_binary": pdf_binary,
-                        "message": f"✅ 科技新闻报告生成成功，PDF大小: {len(pdf_binary)} 字节"
-                    }
-                else:
-                    return {
-                        "success": False,
-                        "error": "❌ 科技新闻报告生成失败"
-                    }
-            elif action == "send_email":
-                return self.send_email(
-                    parameters.get("to", ""),
-                    parameters.get("subject", ""),
-                    parameters.get("body", "")
-                )
-            else:
-                result = f"未知工具：{action}"
-                print(f"❌ 未知工具: {action}")
+            if is_async:
+                return await handler(**kwargs)
 
-            print(f"✅ 工具执行结果: {result}")
+            result = await asyncio.to_thread(handler, **kwargs)
+            logger.debug("✅ 工具执行结果: %s", result)
             return result
 
         except Exception as e:
             error_msg = f"❌ 执行工具 {action} 时出错: {str(e)}"
-            print(error_msg)
-            import traceback
-            print(f"📋 详细错误信息: {traceback.format_exc()}")
-            return error_msg
+            logger.error(error_msg)
+            logger.debug("📋 详细错误信息", exc_info=True)
+            return False, error_msg
 
     async def process_request(self, user_input):
         """处理用户请求（异步版本）- 支持多个工具调用"""
-        print(f"👤 用户输入: {user_input}")
+        logger.info("👤 用户输入: %s", user_input)
 
         messages = [
             {"role": "system", "content": self.system_prompt},
@@ -1616,82 +2162,81 @@ AI：```json
             )
 
             llm_response = response.choices[0].message.content.strip()
-            print(f"🤖 LLM原始响应: {llm_response}")
+            logger.debug("🤖 LLM原始响应: %s", llm_response)
 
             # 检查工具调用 - 支持多个工具调用
             tool_calls = self.extract_tool_calls(llm_response)
             if tool_calls:
-                print(f"🔧 检测到 {len(tool_calls)} 个工具调用")
+                logger.debug("🔧 检测到 %s 个工具调用", len(tool_calls))
 
                 results = []
+                results_ok = []
                 stock_pdf_result = None
                 news_report_result = None
-                success_count = 0
-                failure_count = 0
 
-                # 按顺序执行所有工具调用
-                for i, tool_data in enumerate(tool_calls, 1):
-                    print(f"🔄 执行第 {i}/{len(tool_calls)} 个工具: {tool_data['action']}")
-                    print(f"📋 工具参数: {tool_data['parameters']}")
+                tool_results = [None] * len(tool_calls)
 
+                async def run_tool(i, tool_data):
+                    logger.debug("🔄 执行第 %s/%s 个工具: %s", i, len(tool_calls), tool_data['action'])
+                    logger.debug("📋 工具参数: %s", tool_data['parameters'])
                     try:
-                        tool_result = await self.call_tool(tool_data["action"], tool_data["parameters"])
-
-                        # 检查工具执行结果
-                        if isinstance(tool_result, str):
-                            if "❌" in tool_result or "失败" in tool_result:
-                                failure_count += 1
-                                print(f"❌ 工具执行失败: {tool_result}")
-                            else:
-                                success_count += 1
-                                print(f"✅ 工具执行成功: {tool_result}")
-                        elif isinstance(tool_result, dict):
-                            if tool_result.get("success"):
-                                success_count += 1
-                                print(f"✅ 工具执行成功: {tool_result.get('message', '成功')}")
-                            else:
-                                failure_count += 1
-                                print(f"❌ 工具执行失败: {tool_result.get('error', '未知错误')}")
-
-                        # 特殊处理股票分析工具，返回PDF二进制数据
-                        if tool_data["action"] == "generate_stock_report" and isinstance(tool_result,
-                                                                                         dict) and tool_result.get(
-                                "success"):
-                            stock_pdf_result = {
-                                "type": "stock_pdf",
-                                "success": True,
-                                "pdf_binary": tool_result.get("pdf_binary"),
-                                "message": tool_result.get("message"),
-                                "stock_name": tool_result.get("stock_name")
-                            }
-                            results.append(stock_pdf_result["message"])
-                        elif tool_data["action"] == "generate_news_report" and isinstance(tool_result,
-                                                                                         dict) and tool_result.get(
-                                "success"):
-                            news_report_result = {
-                                "type": "news_pdf",
-                                "success": True,
-                                "pdf_binary": tool_result.get("pdf_binary"),
-                                "message": tool_result.get("message"),
-                            }
-                            results.append(news_report_result["message"])
-                        else:
-                            # 对于其他工具，直接添加结果字符串
-                            results.append(str(tool_result))
-
+                        tool_results[i - 1] = await self.call_tool(tool_data["action"], tool_data["parameters"])
                     except Exception as e:
-                        error_msg = f"❌ 执行工具 {tool_data['action']} 时发生异常: {str(e)}"
-                        print(error_msg)
-                        results.append(error_msg)
-                        failure_count += 1
+                        tool_results[i - 1] = e
 
-                    # 添加工具间的延迟，避免API限制
-                    if i < len(tool_calls):
-                        print(f"⏳ 等待1秒后执行下一个工具...")
-                        await asyncio.sleep(1)
+                async def run_in_order(indexed_calls):
+                    for i, tool_data in indexed_calls:
+                        await run_tool(i, tool_data)
+
+                # 日历/任务调用之间可能相互依赖（如先创建再查询），按LLM给出的顺序逐个执行；
+                # 这也保证同一时刻只有一个线程使用非线程安全的googleapiclient对象。
+                # 邮件和PDF等独立工具与之并发执行
+                google_calls = []
+                other_calls = []
+                for i, tool_data in enumerate(tool_calls, 1):
+                    uses_google = self._dispatch.get(tool_data["action"], (None, False, False))[2]
+                    (google_calls if uses_google else other_calls).append((i, tool_data))
+                await asyncio.gather(run_in_order(google_calls), *(run_tool(i, t) for i, t in other_calls))
+
+                for tool_data, tool_result in zip(tool_calls, tool_results):
+                    # 统一为 (是否成功, 提示文本)
+                    if isinstance(tool_result, BaseException):
+                        ok, text = False, f"❌ 执行工具 {tool_data['action']} 时发生异常: {str(tool_result)}"
+                    elif isinstance(tool_result, dict):
+                        ok = bool(tool_result.get("success"))
+                        text = tool_result.get("message", "成功") if ok else tool_result.get("error", "未知错误")
+                    else:
+                        ok, text = tool_result
+
+                    results_ok.append(ok)
+                    if ok:
+                        logger.debug("✅ 工具执行成功: %s", text)
+                    else:
+                        logger.error("❌ 工具执行失败: %s", text)
+
+                    # 特殊处理股票分析工具，返回PDF二进制数据
+                    if ok and tool_data["action"] == "generate_stock_report":
+                        stock_pdf_result = {
+                            "type": "stock_pdf",
+                            "success": True,
+                            "pdf_binary": tool_result.get("pdf_binary"),
+                            "message": tool_result.get("message"),
+                            "stock_name": tool_result.get("stock_name")
+                        }
+                    elif ok and tool_data["action"] == "generate_news_report":
+                        news_report_result = {
+                            "type": "news_pdf",
+                            "success": True,
+                            "pdf_binary": tool_result.get("pdf_binary"),
+                            "message": tool_result.get("message"),
+                        }
+                    results.append(text)
+
+                success_count = sum(results_ok)
+                failure_count = len(results_ok) - success_count
 
                 # 统计结果
-                print(f"📊 工具执行统计: 成功 {success_count} 个, 失败 {failure_count} 个")
+                logger.info("📊 工具执行统计: 成功 %s 个, 失败 %s 个", success_count, failure_count)
 
                 # 如果有股票PDF结果，优先返回
                 if stock_pdf_result:
@@ -1708,7 +2253,7 @@ AI：```json
                         "success": success_count > 0  # 只要有成功就认为是成功的
                     }
             else:
-                print("💬 无工具调用，直接返回LLM响应")
+                logger.debug("💬 无工具调用，直接返回LLM响应")
                 return {
                     "type": "text",
                     "content": llm_response,
@@ -1717,9 +2262,8 @@ AI：```json
 
         except Exception as e:
             error_msg = f"处理请求时出错：{str(e)}"
-            print(f"❌ {error_msg}")
-            import traceback
-            print(f"📋 详细错误信息: {traceback.format_exc()}")
+            logger.error("❌ %s", error_msg)
+            logger.debug("📋 详细错误信息", exc_info=True)
             return {
                 "type": "text",
                 "content": error_msg,
@@ -11,6 +11,7 @@ import urllib.parse
 import json
 import requests
 import os
+import sys
 import time
 import logging
 import re
@@ -52,6 +53,12 @@ async def lifespan(app: FastAPI):
     yield
     # 关闭时执行的操作
     app_logger.info("🛑 钉钉机器人服务关闭中...")
+    await agent_tools.StockAnalysisPDFAgent.aclose()
+    app_logger.info("✅ 浏览器已关闭")
+    # tech_news按需导入，只有用过才需要关闭其共享会话
+    if "tech_news" in sys.modules:
+        await sys.modules["tech_news"].AsyncTechNewsTool.aclose()
+        app_logger.info("✅ 新闻抓取会话已关闭")
     thread_pool.shutdown(wait=True)
     app_logger.info("✅ 线程池已关闭")
 
@@ -0,0 +1,88 @@
+import hashlib
+import logging
+import os
+import tempfile
+import time
+from typing import Optional
+
+logger = logging.getLogger("disk_cache")
+
+
+class DiskCache:
+    """
+    基于文件的TTL缓存，股票报告PDF和科技新闻正文/摘要共用
+
+    - 每个键对应目录下的一个文件，文件修改时间即写入时间
+    - 写入先落到临时文件再原子替换，读到的永远是完整内容
+    - 过期文件按各自实例的TTL清理，且最多每PURGE_INTERVAL秒扫描一次目录
+    """
+
+    # 两次清理过期文件之间的最小间隔（秒）
+    PURGE_INTERVAL = 600
+
+    def __init__(self, directory: str, ttl: float, suffix: str = ""):
+        """
+        Args:
+            directory: 缓存目录，不同TTL的缓存应使用不同目录
+            ttl: 缓存有效期（秒）
+            suffix: 缓存文件扩展名
+        """
+        self.directory = directory
+        self.ttl = ttl
+        self.suffix = suffix
+        self._last_purge = 0.0
+
+    def _path(self, key: str) -> str:
+        digest = hashlib.sha256(key.encode('utf-8')).hexdigest()
+        return os.path.join(self.directory, f"{digest}{self.suffix}")
+
+    def get(self, key: str) -> Optional[bytes]:
+        """读取缓存，未命中或已过期返回None"""
+        path = self._path(key)
+        try:
+            if time.time() - os.path.getmtime(path) < self.ttl:
+                with open(path, 'rb') as f:
+                    return f.read()
+        except OSError:
+            pass
+        return None
+
+    def set(self, key: str, data: bytes) -> bool:
+        """写入缓存，返回是否写入成功"""
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            self._purge_expired()
+
+            path = self._path(key)
+            # 每次写入使用唯一的临时文件，并发写同一个键时不会互相覆盖
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(data)
+                os.replace(tmp_path, path)
+            except BaseException:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+                raise
+            return True
+        except OSError as e:
+            logger.warning("⚠️ 写入缓存失败: %s", e)
+            return False
+
+    def _purge_expired(self):
+        """清理过期的缓存文件，距上次清理不足PURGE_INTERVAL时直接跳过"""
+        now = time.time()
+        if now - self._last_purge < self.PURGE_INTERVAL:
+            return
+        self._last_purge = now
+
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            try:
+                if now - os.path.getmtime(path) >= self.ttl:
+                    os.remove(path)
+            except OSError:
+                # 文件可能已被并发的清理删除
+                continue
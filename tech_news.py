@@ -3,32 +3,18 @@ import asyncio
 import feedparser
 import json
 import time
-import hashlib
+import html
 import urllib3
-import ssl
 import re
 import io
 import os
-from bs4 import BeautifulSoup
-from openai import AsyncOpenAI
+import threading
 from typing import List, Dict, Any, Optional, Tuple
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 import logging
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, PageBreak
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.lib import colors
-from reportlab.pdfbase import pdfmetrics
-from reportlab.pdfbase.ttfonts import TTFont
-from reportlab.pdfbase import cidfonts
-from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_JUSTIFY
-from reportlab.pdfgen import canvas
-from reportlab.pdfbase.pdfmetrics import registerFontFamily
-import os
 from dotenv import load_dotenv
-import base64
-import brotli
+
+from disk_cache import DiskCache
 
 # 加载环境变量
 load_dotenv()
@@ -40,6 +26,43 @@ urllib3.disable_warnings(urllib3.exceptions.InsecureRequestWarning)
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
 logger = logging.getLogger("TechNewsTool")
 
+# 中英文字符判断用的预编译正则，计数在C层完成
+_CJK_CHAR_RE = re.compile(r'[\u4e00-\u9fff]')
+_ENGLISH_CHAR_RE = re.compile(r'[^\W\d_]|\s|[,.!?;:\-]')
+_WS_RE = re.compile(r'\s+')
+# RSS/Atom响应的开头（XML声明、注释或根元素）
+_FEED_HEAD_RE = re.compile(r'\ufeff?\s*(?:<\?xml|<!--|<rss|<feed|<rdf:RDF)', re.IGNORECASE)
+
+# 文章正文的候选选择器（按优先级排列）
+_ARTICLE_SELECTORS = (
+    'article',
+    '.article-content',
+    '.post-content',
+    '.entry-content',
+    '.story-content',
+    '.content',
+    'main',
+    '[class*="article"]',
+    '[class*="content"]',
+    '[class*="post"]'
+)
+
+# 36氪快讯页面的标题选择器
+_36KR_SELECTORS = (
+    '.newsflash-item .newsflash-item-title',
+    '.newsflash-item .title',
+    'a[href*="/newsflashes/"]'
+)
+
+# MIT Technology Review首页的标题选择器
+_MIT_SELECTORS = (
+    'h3 a',
+    '.headline a',
+    'article h2 a',
+    'a[href*="/article/"]',
+    'a[href*="/story/"]',
+)
+
 
 @dataclass
 class TechNewsToolConfig:
@@ -51,6 +74,7 @@ class TechNewsToolConfig:
     articles_per_source: int = 8
     request_timeout: int = 30  # 增加超时时间
     delay_between_requests: float = 3.0  # 增加请求间隔
+    max_concurrent_articles: int = 8  # 同时处理的文章数上限
 
 
 @dataclass
@@ -62,11 +86,7 @@ class Article:
     description: str = ""
     bilingual_summary: Optional[Dict[str, str]] = None
     content: str = ""
-    keywords: List[str] = None
-
-    def __post_init__(self):
-        if self.keywords is None:
-            self.keywords = []
+    keywords: List[str] = field(default_factory=list)
 
 
 class AsyncTechNewsTool:
@@ -94,6 +114,25 @@ class AsyncTechNewsTool:
     # 类变量，用于存储PDF样式，避免重复创建
     _pdf_styles = None
     _fonts_registered = False
+    # 注册成功的中文字体名，注册失败时为None
+    _chinese_font = None
+    # PDF在线程池中生成，字体注册和样式创建需加锁保证只执行一次；
+    # _create_pdf_styles持锁时会调用_register_chinese_fonts，因此使用可重入锁
+    _pdf_init_lock = threading.RLock()
+
+    # 进程内共享的aiohttp会话
+    _shared_session = None
+    # 进程内共享的豆包客户端：(api_key, base_url) -> AsyncOpenAI
+    _doubao_clients = {}
+
+    # 文章正文和AI摘要的磁盘缓存，跨次运行复用（RSS在短时间内大量重复）
+    CACHE_DIR = os.environ.get("TECH_NEWS_CACHE_DIR", "/tmp/tech_news_cache")
+    CONTENT_CACHE_TTL = 6 * 3600
+    SUMMARY_CACHE_TTL = 24 * 3600
+    _caches = {
+        "content": DiskCache(os.path.join(CACHE_DIR, "content"), CONTENT_CACHE_TTL, ".json"),
+        "summary": DiskCache(os.path.join(CACHE_DIR, "summary"), SUMMARY_CACHE_TTL, ".json"),
+    }
 
     def __init__(self, config: TechNewsToolConfig):
         """
@@ -104,22 +143,35 @@ class AsyncTechNewsTool:
         """
         self.config = config
 
-        # 豆包客户端配置
+        # 豆包客户端配置（同一配置的客户端在进程内复用，保持HTTP/2长连接）
         self.doubao_client = None
         if config.doubao_api_key and config.doubao_base_url:
             try:
-                self.doubao_client = AsyncOpenAI(
-                    api_key=config.doubao_api_key,
-                    base_url=config.doubao_base_url
-                )
+                client_key = (config.doubao_api_key, config.doubao_base_url)
+                if client_key not in AsyncTechNewsTool._doubao_clients:
+                    # openai/httpx只在首次创建客户端时导入
+                    import httpx
+                    from openai import AsyncOpenAI
+
+                    AsyncTechNewsTool._doubao_clients[client_key] = AsyncOpenAI(
+                        api_key=config.doubao_api_key,
+                        base_url=config.doubao_base_url,
+                        http_client=httpx.AsyncClient(
+                            http2=True,
+                            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
+                            timeout=60
+                        )
+                    )
+                self.doubao_client = AsyncTechNewsTool._doubao_clients[client_key]
                 logger.info("豆包异步客户端初始化成功")
             except Exception as e:
                 logger.error(f"豆包异步客户端初始化失败: {e}")
 
         self.model_id = "bot-20250907084333-cbvff"
 
-        # 创建aiohttp会话
+        # aiohttp会话，进入上下文时绑定共享会话
         self.session = None
+        self.timeout = None
 
         # 科技关键词定义
         self.tech_keywords = [
@@ -155,13 +207,8 @@ class AsyncTechNewsTool:
             'Internet of Things', 'IoT', '5G', '6G', '半导体', '芯片', '纳米技术', '虚拟现实'
         ]
 
-        # 非科技内容排除词
-        self.non_tech_indicators = [
-            'pizza', 'oven', 'vacuum', 'gift', 'sexy', 'dating', 'relationship',
-            'lice', 'craft', 'spa', 'butt lift', 'cosmetic', 'entertainment',
-            'financial', 'stock', 'investment', 'bank', 'loan', 'credit',
-            'shopping', 'retail', 'consumer', 'lifestyle', 'travel', 'food'
-        ]
+        # 预先转小写的关键词，匹配时只需对文本做一次lower()
+        self._tech_keywords_lower = tuple(kw.lower() for kw in self.tech_keywords)
 
         # 中英文摘要系统提示词
         self.bilingual_summary_prompt = """你是一位专业的科技新闻编辑，你的任务是为读者生成简洁、准确、有深度的科技新闻摘要。
@@ -184,6 +231,22 @@ class AsyncTechNewsTool:
 
 请严格按照上述格式输出，不要添加任何额外的说明或标记。"""
 
+        # 批量摘要系统提示词：一次请求为多篇文章生成摘要
+        self.batch_summary_prompt = """你是一位专业的科技新闻编辑，你的任务是为读者生成简洁、准确、有深度的科技新闻摘要。
+
+用户会一次给出多篇带编号的科技新闻，请为每一篇分别生成中英文双语摘要。
+
+**内容要求：**
+1. 每种语言用2-3句话概括新闻的核心内容
+2. 突出技术亮点、创新点和行业影响
+3. 指出该技术可能的应用场景或市场前景
+4. 语言简洁专业，避免营销术语
+5. 如果涉及具体数据或融资信息，请准确包含
+
+**输出格式：**
+只输出一个JSON数组，不要添加任何额外的说明或标记，每篇文章对应一项：
+[{"id": 文章编号, "chinese": "中文摘要", "english": "英文摘要"}]"""
+
         logger.info("异步科技新闻工具初始化完成")
 
     def _register_chinese_fonts(self):
@@ -191,64 +254,76 @@ class AsyncTechNewsTool:
         if AsyncTechNewsTool._fonts_registered:
             return
 
-        try:
-            # 在Render平台上，我们使用ReportLab内置的CID字体，这是最可靠的方法
-            logger.info("使用ReportLab内置CID字体支持中文")
-
-            # 注册内置CID字体
-            pdfmetrics.registerFont(cidfonts.UnicodeCIDFont('STSong-Light'))
-
-            # 同时尝试注册常见的CID字体
-            cid_fonts = ['STSong-Light', 'STSongStd-Light', 'HeiseiMin-W3', 'HeiseiKakuGo-W5']
-            for font_name in cid_fonts:
-                try:
-                    pdfmetrics.registerFont(cidfonts.UnicodeCIDFont(font_name))
-                    logger.info(f"成功注册CID字体: {font_name}")
-                except:
-                    continue
+        from reportlab.pdfbase import pdfmetrics, cidfonts
 
-            AsyncTechNewsTool._fonts_registered = True
-            logger.info("中文字体注册完成，使用CID字体")
+        with AsyncTechNewsTool._pdf_init_lock:
+            # 等锁期间可能已被其他线程注册
+            if AsyncTechNewsTool._fonts_registered:
+                return
 
-        except Exception as e:
-            logger.error(f"注册中文字体失败: {e}")
-            # 即使字体注册失败，我们仍然继续，让ReportLab使用默认字体
+            try:
+                # 在Render平台上，我们使用ReportLab内置的CID字体，这是最可靠的方法
+                logger.info("使用ReportLab内置CID字体支持中文")
 
-    async def __aenter__(self):
-        """异步上下文管理器入口 - 针对Render优化"""
-        # 创建自定义TCP连接器，优化跨境连接
-        connector = aiohttp.TCPConnector(
-            ssl=False,
-            limit=20,  # 增加连接限制
-            limit_per_host=5,  # 增加每主机连接数
-            use_dns_cache=True,
-            ttl_dns_cache=300,
-            keepalive_timeout=30
-        )
+                # 注册内置CID字体：CID字体不嵌入字形，PDF体积和排版耗时都不受中文字库大小影响
+                # 样式里只会用到STSong-Light，不再额外注册用不上的日文字体
+                pdfmetrics.registerFont(cidfonts.UnicodeCIDFont('STSong-Light'))
+                AsyncTechNewsTool._chinese_font = 'STSong-Light'
+
+                AsyncTechNewsTool._fonts_registered = True
+                logger.info("中文字体注册完成，使用CID字体")
+
+            except Exception as e:
+                logger.error(f"注册中文字体失败: {e}")
+                # 即使字体注册失败，我们仍然继续，让ReportLab使用默认字体
+
+    @classmethod
+    def _get_shared_session(cls) -> aiohttp.ClientSession:
+        """获取进程内共享的aiohttp会话，多次生成报告之间复用连接池和DNS缓存"""
+        if cls._shared_session is None or cls._shared_session.closed:
+            # 创建自定义TCP连接器，优化跨境连接
+            connector = aiohttp.TCPConnector(
+                ssl=False,
+                limit=20,  # 增加连接限制
+                limit_per_host=5,  # 增加每主机连接数
+                use_dns_cache=True,
+                ttl_dns_cache=300,
+                keepalive_timeout=30
+            )
+
+            cls._shared_session = aiohttp.ClientSession(
+                connector=connector,
+                headers={
+                    'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
+                    'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
+                    'Accept-Language': 'en-US,en;q=0.9',
+                    'Accept-Encoding': 'gzip, deflate',  # 移除br以避免brotli问题
+                    'Cache-Control': 'no-cache'
+                }
+            )
+        return cls._shared_session
 
-        timeout = aiohttp.ClientTimeout(
+    @classmethod
+    async def aclose(cls):
+        """关闭共享的aiohttp会话（服务退出时调用）"""
+        if cls._shared_session is not None and not cls._shared_session.closed:
+            await cls._shared_session.close()
+        cls._shared_session = None
+
+    async def __aenter__(self):
+        """异步上下文管理器入口 - 复用共享会话"""
+        self.session = self._get_shared_session()
+        # 超时按本次配置在每个请求上设置
+        self.timeout = aiohttp.ClientTimeout(
             total=self.config.request_timeout,
             connect=15,
             sock_read=25
         )
-
-        self.session = aiohttp.ClientSession(
-            timeout=timeout,
-            connector=connector,
-            headers={
-                'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
-                'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,image/apng,*/*;q=0.8,application/signed-exchange;v=b3;q=0.7',
-                'Accept-Language': 'en-US,en;q=0.9',
-                'Accept-Encoding': 'gzip, deflate',  # 移除br以避免brotli问题
-                'Cache-Control': 'no-cache'
-            }
-        )
         return self
 
     async def __aexit__(self, exc_type, exc_val, exc_tb):
-        """异步上下文管理器出口"""
-        if self.session:
-            await self.session.close()
+        """异步上下文管理器出口 - 共享会话保持打开，由aclose统一关闭"""
+        self.session = None
 
     async def _make_request(self, url: str, method: str = "GET",
                             headers: Dict = None, data: Any = None) -> str:
@@ -279,6 +354,7 @@ class AsyncTechNewsTool:
                 async with self.session.request(method, url,
                                                 headers=request_headers,
                                                 data=data,
+                                                timeout=self.timeout,
                                                 ssl=False) as response:
 
                     # 检查状态码
@@ -326,21 +402,30 @@ class AsyncTechNewsTool:
 
         raise Exception(f"所有 {max_retries} 次尝试都失败了")
 
-    def is_tech_related(self, title: str, description: str = "") -> bool:
-        """判断文章是否与前沿科技相关"""
-        combined_text = (title + " " + description).lower()
+    def _cache_get(self, kind: str, key: str) -> Any:
+        """读取缓存（kind为 "content" 或 "summary"），未命中或已过期返回None"""
+        data = self._caches[kind].get(key)
+        if data is None:
+            return None
+        try:
+            return json.loads(data)
+        except ValueError:
+            return None
 
-        # 检查是否包含科技关键词
-        for keyword in self.tech_keywords:
-            if keyword.lower() in combined_text:
-                return True
+    def _cache_set(self, kind: str, key: str, value: Any):
+        """写入缓存，过期文件的清理由DiskCache按各自TTL节流进行"""
+        self._caches[kind].set(key, json.dumps(value, ensure_ascii=False).encode('utf-8'))
 
-        # 排除明显非科技的内容
-        for indicator in self.non_tech_indicators:
-            if indicator in combined_text:
-                return False
+    def is_tech_related(self, title: str, description: str = "") -> bool:
+        """判断文章是否与前沿科技相关"""
+        # 命中任一科技关键词即视为相关；未命中的（包括含非科技排除词的）一律不相关
+        combined_text = f"{title} {description}".lower()
+        return any(keyword in combined_text for keyword in self._tech_keywords_lower)
 
-        return False
+    def _find_keywords(self, text: str) -> List[str]:
+        """返回文本中命中的科技关键词（保持关键词原始写法）"""
+        text = text.lower()
+        return [kw for kw, kw_lower in zip(self.tech_keywords, self._tech_keywords_lower) if kw_lower in text]
 
     async def extract_article_content(self, url: str) -> str:
         """异步从文章URL提取核心内容 - 针对国外网站优化"""
@@ -375,34 +460,22 @@ class AsyncTechNewsTool:
                 logger.warning(f"内容访问被屏蔽: {url}")
                 return "由于网站访问限制，无法直接提取内容。请点击链接查看原文。"
 
-            soup = BeautifulSoup(content, 'html.parser')
+            from selectolax.parser import HTMLParser
+
+            tree = HTMLParser(content)
 
             # 移除不需要的标签
-            for element in soup(['script', 'style', 'nav', 'footer', 'header', 'aside', 'iframe']):
+            for element in tree.css('script, style, nav, footer, header, aside, iframe'):
                 element.decompose()
 
-            # 针对不同网站的特定内容选择器
-            content_selectors = [
-                'article',
-                '.article-content',
-                '.post-content',
-                '.entry-content',
-                '.story-content',
-                '.content',
-                'main',
-                '[class*="article"]',
-                '[class*="content"]',
-                '[class*="post"]'
-            ]
-
             extracted_content = ""
-            for selector in content_selectors:
-                article_element = soup.select_one(selector)
+            for selector in _ARTICLE_SELECTORS:
+                article_element = tree.css_first(selector)
                 if article_element:
-                    paragraphs = article_element.find_all(['p', 'h1', 'h2', 'h3'])
+                    paragraphs = article_element.css('p, h1, h2, h3')
                     text_content = []
                     for p in paragraphs:
-                        text = p.get_text(strip=True)
+                        text = p.text(strip=True)
                         if len(text) > 50 and not any(word in text.lower() for word in
                                                       ['advertisement', 'sponsored', 'subscribe']):
                             text_content.append(text)
@@ -413,10 +486,10 @@ class AsyncTechNewsTool:
 
             # 备用策略
             if not extracted_content or len(extracted_content) < 200:
-                all_paragraphs = soup.find_all('p')
+                all_paragraphs = tree.css('p')
                 paragraph_texts = []
                 for p in all_paragraphs:
-                    text = p.get_text(strip=True)
+                    text = p.text(strip=True)
                     if len(text) > 100 and len(text) < 2000:
                         paragraph_texts.append(text)
 
@@ -425,9 +498,10 @@ class AsyncTechNewsTool:
 
             # 清理内容
             if extracted_content:
-                extracted_content = re.sub(r'\s+', ' ', extracted_content)
-                if len(extracted_content) > 1500:
-                    extracted_content = extracted_content[:1497] + "..."
+                extracted_content = _WS_RE.sub(' ', extracted_content)
+                # 2-3句摘要用不到太长的上下文，截断到800字符以减少输入token
+                if len(extracted_content) > 800:
+                    extracted_content = extracted_content[:797] + "..."
 
             return extracted_content if extracted_content else "由于网站访问限制，无法直接提取内容。请点击链接查看原文。"
 
@@ -449,6 +523,10 @@ class AsyncTechNewsTool:
                 "english": "Unable to retrieve article content, cannot generate summary"
             }
 
+        cached = self._cache_get("summary", f"{title}|{content[:500]}")
+        if cached:
+            return cached
+
         try:
             user_prompt = f"请为以下科技新闻生成中英文双语摘要：\n\n标题：{title}\n\n内容：{content}"
 
@@ -459,11 +537,26 @@ class AsyncTechNewsTool:
                     {"role": "user", "content": user_prompt}
                 ],
                 max_tokens=800,
-                temperature=0.3
+                temperature=0.3,
+                stream=True
             )
 
-            full_summary = response.choices[0].message.content.strip()
-            return self._parse_bilingual_summary(full_summary)
+            # 流式读取，中英文两段都已完整时提前结束，不再等待多余的token
+            parts = []
+            try:
+                async for chunk in response:
+                    if chunk.choices:
+                        parts.append(chunk.choices[0].delta.content or "")
+                        if self._has_both_sections("".join(parts)):
+                            break
+            finally:
+                await response.response.aclose()
+
+            full_summary = "".join(parts).strip()
+            summary = self._parse_bilingual_summary(full_summary)
+            if summary["chinese"] != "未能解析中文摘要" and summary["english"] != "Failed to parse English summary":
+                self._cache_set("summary", f"{title}|{content[:500]}", summary)
+            return summary
 
         except Exception as e:
             logger.error(f"生成AI摘要失败: {e}")
@@ -473,6 +566,97 @@ class AsyncTechNewsTool:
                 "english": f"AI summary generation failed: {str(e)}"
             }
 
+    async def generate_bilingual_summaries_batch(self, articles: List[Article]) -> List[Dict[str, str]]:
+        """
+        一次LLM请求为多篇文章生成中英文双语摘要
+
+        Args:
+            articles: 已提取正文的文章列表
+
+        Returns:
+            List[Dict]: 与articles一一对应的摘要，批量结果缺失的文章单独补生成
+        """
+        if not articles:
+            return []
+
+        if not self.doubao_client:
+            return [{
+                "chinese": "豆包客户端未配置，无法生成AI摘要",
+                "english": "Doubao client not configured, unable to generate AI summary"
+            } for _ in articles]
+
+        summaries: List[Optional[Dict[str, str]]] = [None] * len(articles)
+        pending = []
+        for i, article in enumerate(articles):
+            if "出错" in article.content or "无法提取" in article.content:
+                summaries[i] = {
+                    "chinese": "无法获取文章内容，无法生成摘要",
+                    "english": "Unable to retrieve article content, cannot generate summary"
+                }
+            else:
+                cached = self._cache_get("summary", f"{article.title}|{article.content[:500]}")
+                if cached:
+                    summaries[i] = cached
+                else:
+                    pending.append(i)
+
+        if pending:
+            try:
+                parts = [f"请为以下{len(pending)}篇科技新闻分别生成中英文双语摘要：\n"]
+                for i in pending:
+                    parts.append(f"[{i}] 标题：{articles[i].title}\n内容：{articles[i].content[:800]}\n")
+
+                response = await self.doubao_client.chat.completions.create(
+                    model=self.model_id,
+                    messages=[
+                        {"role": "system", "content": self.batch_summary_prompt},
+                        {"role": "user", "content": "\n".join(parts)}
+                    ],
+                    max_tokens=800 * len(pending),
+                    temperature=0.3
+                )
+
+                for item in self._parse_batch_summaries(response.choices[0].message.content):
+                    i = item.get("id")
+                    if isinstance(i, int) and i in pending and item.get("chinese") and item.get("english"):
+                        summaries[i] = {"chinese": item["chinese"], "english": item["english"]}
+                        self._cache_set("summary", f"{articles[i].title}|{articles[i].content[:500]}", summaries[i])
+
+            except Exception as e:
+                logger.error(f"批量生成AI摘要失败，改为逐篇生成: {e}")
+
+        # 批量结果中缺失的文章逐篇补生成
+        missing = [i for i in pending if summaries[i] is None]
+        if missing:
+            logger.warning(f"批量摘要缺少 {len(missing)} 篇，逐篇补生成")
+            fallback = await asyncio.gather(*(
+                self.generate_bilingual_summary(articles[i].title, articles[i].content) for i in missing
+            ))
+            for i, summary in zip(missing, fallback):
+                summaries[i] = summary
+
+        return summaries
+
+    def _parse_batch_summaries(self, text: str) -> List[Dict[str, Any]]:
+        """解析批量摘要返回的JSON数组（兼容外层对象包装和代码块标记）"""
+        start = min((pos for pos in (text.find("["), text.find("{")) if pos != -1), default=-1)
+        if start == -1:
+            return []
+
+        data = json.loads(text[start:text.rfind("]" if text[start] == "[" else "}") + 1])
+        if isinstance(data, dict):
+            data = next((v for v in data.values() if isinstance(v, list)), [])
+        return [item for item in data if isinstance(item, dict)]
+
+    def _has_both_sections(self, text: str) -> bool:
+        """流式输出中是否已包含完整的中文摘要和英文摘要（英文摘要后出现空行视为结束）"""
+        zh_pos = text.find('中文摘要')
+        en_pos = text.find('英文摘要')
+        if zh_pos == -1 or en_pos < zh_pos:
+            return False
+        tail = text[en_pos + len('英文摘要'):].lstrip('：: \n')
+        return bool(tail) and '\n\n' in tail
+
     def _parse_bilingual_summary(self, summary_text: str) -> Dict[str, str]:
         """解析AI返回的双语摘要文本，分离中英文部分"""
         result = {
@@ -527,14 +711,21 @@ class AsyncTechNewsTool:
 
     def _is_mostly_chinese(self, text: str) -> bool:
         """判断文本是否主要是中文"""
-        chinese_chars = len([c for c in text if '\u4e00' <= c <= '\u9fff'])
+        chinese_chars = len(_CJK_CHAR_RE.findall(text))
         return chinese_chars / max(len(text), 1) > 0.5
 
     def _is_mostly_english(self, text: str) -> bool:
         """判断文本是否主要是英文"""
-        english_chars = len([c for c in text if c.isalpha() or c.isspace() or c in ',.!?;:-'])
+        english_chars = len(_ENGLISH_CHAR_RE.findall(text))
         return english_chars / max(len(text), 1) > 0.7 and not self._is_mostly_chinese(text)
 
+    def _parse_feed(self, content: str, url: str) -> Optional[Any]:
+        """先快速判断响应是否为RSS/Atom，再交给feedparser解析；HTML错误页等非feed内容直接返回None"""
+        if not _FEED_HEAD_RE.match(content):
+            logger.warning(f"{url} 返回的不是RSS/Atom内容，跳过")
+            return None
+        return feedparser.parse(content)
+
     async def fetch_techcrunch(self, max_articles: int = 15) -> List[Article]:
         """异步获取TechCrunch头条 - 优化版本"""
         articles = []
@@ -556,8 +747,8 @@ class AsyncTechNewsTool:
 
                 content = await self._make_request(rss_url, headers=headers)
 
-                feed = feedparser.parse(content)
-                if feed.entries:
+                feed = self._parse_feed(content, rss_url)
+                if feed and feed.entries:
                     logger.info(f"TechCrunch: 成功获取到 {len(feed.entries)} 条新闻")
 
                     for entry in feed.entries[:max_articles]:
@@ -597,10 +788,11 @@ class AsyncTechNewsTool:
         try:
             content = await self._make_request(url)
 
-            feed = feedparser.parse(content)
-            logger.info(f"Wired: 成功获取到 {len(feed.entries)} 条新闻")
+            feed = self._parse_feed(content, url)
+            entries = feed.entries if feed else []
+            logger.info(f"Wired: 成功获取到 {len(entries)} 条新闻")
 
-            for entry in feed.entries[:max_articles]:
+            for entry in entries[:max_articles]:
                 if self.is_tech_related(entry.title, entry.get('summary', '')):
                     article = Article(
                         title=entry.title,
@@ -630,8 +822,8 @@ class AsyncTechNewsTool:
         rss_url = "https://36kr.com/feed"
         try:
             content = await self._make_request(rss_url)
-            feed = feedparser.parse(content)
-            if feed.entries:
+            feed = self._parse_feed(content, rss_url)
+            if feed and feed.entries:
                 logger.info(f"36氪RSS: 成功获取到 {len(feed.entries)} 条新闻")
 
                 for entry in feed.entries[:max_articles]:
@@ -652,7 +844,9 @@ class AsyncTechNewsTool:
         except Exception as e:
             logger.error(f"36氪RSS获取失败: {e}")
 
-        # 如果RSS失败，使用网页解析备用方案
+        # 如果RSS失败，使用网页解析备用方案（BeautifulSoup只在备用方案中用到，按需导入）
+        from bs4 import BeautifulSoup
+
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
         }
@@ -670,13 +864,7 @@ class AsyncTechNewsTool:
 
                 # 查找新闻标题
                 titles = []
-                selectors = [
-                    '.newsflash-item .newsflash-item-title',
-                    '.newsflash-item .title',
-                    'a[href*="/newsflashes/"]'
-                ]
-
-                for selector in selectors:
+                for selector in _36KR_SELECTORS:
                     elements = soup.select(selector)
                     if elements:
                         for element in elements:
@@ -721,8 +909,8 @@ class AsyncTechNewsTool:
             try:
                 logger.info(f"尝试MIT RSS源: {rss_url}")
                 content = await self._make_request(rss_url)
-                feed = feedparser.parse(content)
-                if feed.entries:
+                feed = self._parse_feed(content, rss_url)
+                if feed and feed.entries:
                     logger.info(f"MIT RSS: 成功获取到 {len(feed.entries)} 条新闻")
 
                     for entry in feed.entries[:max_articles]:
@@ -744,6 +932,8 @@ class AsyncTechNewsTool:
                 logger.error(f"MIT RSS源失败 ({rss_url}): {e}")
 
         # 如果所有RSS都失败，使用网页解析
+        from bs4 import BeautifulSoup
+
         url = "https://www.technologyreview.com/"
         headers = {
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
@@ -755,16 +945,8 @@ class AsyncTechNewsTool:
             soup = BeautifulSoup(content, 'html.parser')
             logger.info(f"MIT页面获取成功，开始解析...")
 
-            selectors = [
-                'h3 a',
-                '.headline a',
-                'article h2 a',
-                'a[href*="/article/"]',
-                'a[href*="/story/"]',
-            ]
-
             seen_titles = set()
-            for selector in selectors:
+            for selector in _MIT_SELECTORS:
                 elements = soup.select(selector)
                 if elements:
                     for element in elements:
@@ -851,6 +1033,19 @@ class AsyncTechNewsTool:
         if AsyncTechNewsTool._pdf_styles is not None:
             return AsyncTechNewsTool._pdf_styles
 
+        with AsyncTechNewsTool._pdf_init_lock:
+            # 等锁期间可能已被其他线程创建
+            if AsyncTechNewsTool._pdf_styles is None:
+                AsyncTechNewsTool._pdf_styles = self._build_pdf_styles()
+            return AsyncTechNewsTool._pdf_styles
+
+    def _build_pdf_styles(self):
+        """实际创建PDF样式，由_create_pdf_styles在持锁时调用"""
+        # reportlab只在生成PDF时才导入
+        from reportlab.lib import colors
+        from reportlab.lib.enums import TA_LEFT, TA_CENTER, TA_JUSTIFY
+        from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
+
         # 注册中文字体
         self._register_chinese_fonts()
 
@@ -859,19 +1054,11 @@ class AsyncTechNewsTool:
         # 使用唯一的前缀避免样式名称冲突
         style_prefix = "TechNews_"
 
-        # 获取可用的字体 - 在Render平台上优先使用CID字体
-        available_fonts = pdfmetrics.getRegisteredFontNames()
-
-        # 分离中英文字体设置
-        chinese_font = None
+        # 分离中英文字体设置 - 中文直接使用注册时记下的CID字体，不再扫描已注册字体列表
+        chinese_font = AsyncTechNewsTool._chinese_font
         english_font = 'Helvetica'  # 英文字体使用Helvetica
-
-        # 优先寻找CID字体用于中文
-        for font in available_fonts:
-            if any(name in font.lower() for name in ['stsong', 'unicodecid', 'cid']):
-                chinese_font = font
-                logger.info(f"使用CID字体: {chinese_font}")
-                break
+        if chinese_font:
+            logger.info(f"使用CID字体: {chinese_font}")
 
         # 如果找不到CID字体，使用默认字体
         if chinese_font is None:
@@ -1010,8 +1197,6 @@ class AsyncTechNewsTool:
                 spaceShrinkage=0.0  # 禁用字间距调整
             ))
 
-        # 保存到类变量
-        AsyncTechNewsTool._pdf_styles = styles
         return styles
 
     def _generate_pdf(self, articles: List[Article], source_stats: Dict[str, int]) -> bytes:
@@ -1025,10 +1210,14 @@ class AsyncTechNewsTool:
         Returns:
             bytes: PDF二进制数据
         """
-        try:
-            # 创建内存缓冲区
-            buffer = io.BytesIO()
+        from reportlab.lib import colors
+        from reportlab.lib.pagesizes import A4
+        from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, HRFlowable
 
+        # 创建内存缓冲区，无论成功失败都在finally中释放
+        buffer = io.BytesIO()
+
+        try:
             # 创建PDF文档
             doc = SimpleDocTemplate(
                 buffer,
@@ -1075,7 +1264,8 @@ class AsyncTechNewsTool:
                     title_style = styles[f"{style_prefix}ArticleTitle"]
 
                 # 文章标题
-                article_title = Paragraph(f"{i}. {article.title}", title_style)
+                # 标题、链接和摘要来自外部，先转义再交给Paragraph的XML解析，避免&、<等字符导致解析失败
+                article_title = Paragraph(f"{i}. {html.escape(article.title, quote=False)}", title_style)
                 content.append(article_title)
 
                 # 来源
@@ -1083,7 +1273,7 @@ class AsyncTechNewsTool:
                 content.append(source_para)
 
                 # 链接
-                link_para = Paragraph(f"链接: {article.link}", styles[f"{style_prefix}Link"])
+                link_para = Paragraph(f"链接: {html.escape(article.link, quote=False)}", styles[f"{style_prefix}Link"])
                 content.append(link_para)
 
                 # 关键词
@@ -1098,7 +1288,7 @@ class AsyncTechNewsTool:
                     chinese_title = Paragraph("中文摘要:", styles[f"{style_prefix}SummaryTitle"])
                     content.append(chinese_title)
 
-                    chinese_text = article.bilingual_summary.get('chinese', '无中文摘要')
+                    chinese_text = html.escape(article.bilingual_summary.get('chinese', '无中文摘要'), quote=False)
                     chinese_para = Paragraph(chinese_text, styles[f"{style_prefix}SummaryText"])
                     content.append(chinese_para)
 
@@ -1106,24 +1296,20 @@ class AsyncTechNewsTool:
                     english_title = Paragraph("English Summary:", styles[f"{style_prefix}SummaryTitle"])
                     content.append(english_title)
 
-                    english_text = article.bilingual_summary.get('english', 'No English summary')
+                    english_text = html.escape(article.bilingual_summary.get('english', 'No English summary'), quote=False)
                     english_para = Paragraph(english_text, styles[f"{style_prefix}EnglishSummaryText"])
                     content.append(english_para)
 
-                # 分隔线
+                # 分隔线 - 直接绘制，上下留白由分隔线自身的间距承担，不再额外插入Spacer
                 if i < len(articles):
-                    content.append(Spacer(1, 20))
-                    content.append(Paragraph("_" * 80, styles['Normal']))
-                    content.append(Spacer(1, 20))
-                else:
-                    content.append(Spacer(1, 20))
+                    content.append(HRFlowable(width="100%", thickness=0.5, color=colors.grey,
+                                              spaceBefore=20, spaceAfter=20))
 
             # 构建PDF
             doc.build(content)
 
             # 获取PDF二进制数据
             pdf_data = buffer.getvalue()
-            buffer.close()
 
             logger.info(f"PDF生成成功，大小: {len(pdf_data)} 字节")
             return pdf_data
@@ -1131,6 +1317,8 @@ class AsyncTechNewsTool:
         except Exception as e:
             logger.error(f"生成PDF失败: {e}")
             raise Exception(f"PDF生成失败: {str(e)}")
+        finally:
+            buffer.close()
 
     async def execute(self,
                       enable_ai_summary: bool = None,
@@ -1160,22 +1348,23 @@ class AsyncTechNewsTool:
 
         source_results = {}
 
-        # 顺序执行所有来源的获取任务，增加延迟
-        for source_name in sources:
-            if source_name in source_fetchers:
-                logger.info(f"正在从 {source_name} 获取新闻...")
-                try:
-                    articles = await source_fetchers[source_name](articles_per_source)
-                    source_results[source_name] = articles
-                    all_articles.extend(articles)
-                    logger.info(f"✅ {source_name}: 成功获取 {len(articles)} 篇文章")
-
-                    # 增加延迟避免请求过于频繁
-                    await asyncio.sleep(3.0)  # 增加到3秒
+        # 各来源相互独立，并发获取
+        selected = [name for name in dict.fromkeys(sources) if name in source_fetchers]
+        for name in selected:
+            logger.info(f"正在从 {name} 获取新闻...")
+        results = await asyncio.gather(
+            *(source_fetchers[name](articles_per_source) for name in selected),
+            return_exceptions=True
+        )
 
-                except Exception as e:
-                    logger.error(f"❌ {source_name}: 获取失败 - {e}")
-                    source_results[source_name] = []
+        for source_name, articles in zip(selected, results):
+            if isinstance(articles, Exception):
+                logger.error(f"❌ {source_name}: 获取失败 - {articles}")
+                source_results[source_name] = []
+            else:
+                source_results[source_name] = articles
+                all_articles.extend(articles)
+                logger.info(f"✅ {source_name}: 成功获取 {len(articles)} 篇文章")
 
         # 统计各来源结果
         source_stats = {source: len(articles) for source, articles in source_results.items()}
@@ -1186,7 +1375,7 @@ class AsyncTechNewsTool:
         seen = set()
         unique_articles = []
         for article in all_articles:
-            identifier = hashlib.md5(f"{article.title}_{article.source}".encode()).hexdigest()
+            identifier = (article.title, article.source)
             if identifier not in seen:
                 seen.add(identifier)
                 unique_articles.append(article)
@@ -1202,32 +1391,33 @@ class AsyncTechNewsTool:
         if enable_ai_summary and self.doubao_client:
             logger.info("正在使用AI生成双语新闻摘要...")
 
-            # 并发处理文章内容提取和AI摘要生成
-            process_tasks = []
-            for article in balanced_articles:
-                task = asyncio.create_task(self._process_article(article))
-                process_tasks.append(task)
+            # 所有文章并发提取正文，用信号量限制同时在途的请求数
+            sem = asyncio.Semaphore(self.config.max_concurrent_articles)
 
-            # 限制并发数量，避免过多请求
-            for i in range(0, len(process_tasks), 3):  # 每次处理3篇文章
-                batch = process_tasks[i:i + 3]
-                results = await asyncio.gather(*batch, return_exceptions=True)
+            async def process_one(article: Article) -> Article:
+                async with sem:
+                    return await self._process_article(article)
 
-                for result in results:
-                    if isinstance(result, Exception):
-                        logger.error(f"处理文章时出错: {result}")
-                    else:
-                        final_articles.append(result)
+            results = await asyncio.gather(*(process_one(a) for a in balanced_articles),
+                                           return_exceptions=True)
 
-                # 批次之间添加延迟
-                if i + 3 < len(process_tasks):
-                    await asyncio.sleep(self.config.delay_between_requests)
+            for result in results:
+                if isinstance(result, Exception):
+                    logger.error(f"处理文章时出错: {result}")
+                else:
+                    final_articles.append(result)
+
+            # 一次LLM请求生成所有文章的双语摘要
+            summaries = await self.generate_bilingual_summaries_batch(final_articles)
+            for article, summary in zip(final_articles, summaries):
+                article.bilingual_summary = summary
         else:
             final_articles = balanced_articles
 
         # 生成PDF
         try:
-            pdf_data = self._generate_pdf(final_articles, source_stats)
+            # doc.build是CPU密集的同步调用，放到线程中执行，避免阻塞事件循环
+            pdf_data = await asyncio.to_thread(self._generate_pdf, final_articles, source_stats)
 
             # 构建元数据
             metadata = {
@@ -1256,85 +1446,88 @@ class AsyncTechNewsTool:
             return (False, b"", {"error": str(e)})
 
     async def _process_article(self, article: Article) -> Article:
-        """异步处理单篇文章（内容提取和AI摘要）"""
+        """异步处理单篇文章（内容提取和关键词，AI摘要在execute中批量生成）"""
         logger.info(f"处理文章: {article.source}: {article.title[:50]}...")
 
-        # 提取文章内容
-        content = await self.extract_article_content(article.link)
+        # 提取文章内容（优先使用缓存，只缓存成功提取的正文）
+        content = self._cache_get("content", article.link)
+        if content is None:
+            content = await self.extract_article_content(article.link)
+            if "无法直接提取内容" not in content and not content.startswith("内容提取受限"):
+                self._cache_set("content", article.link, content)
         article.content = content
 
-        # 生成双语AI摘要
-        bilingual_summary = await self.generate_bilingual_summary(article.title, content)
-        article.bilingual_summary = bilingual_summary
-
         # 提取关键词
-        article.keywords = [kw for kw in self.tech_keywords if kw.lower() in article.title.lower()]
+        article.keywords = self._find_keywords(article.title)
 
         return article
 
-    def get_tool_schema(self) -> Dict[str, Any]:
-        """
-        获取工具的模式定义，用于LLM工具调用
-
-        Returns:
-            Dict: 工具的模式定义
-        """
-        return {
-            "name": self.name,
-            "description": self.description,
-            "parameters": {
-                "type": "object",
-                "properties": {
-                    "enable_ai_summary": {
-                        "type": "boolean",
-                        "description": "是否启用AI摘要生成",
-                        "default": True
-                    },
-                    "total_articles": {
-                        "type": "integer",
-                        "description": "需要获取的文章总数",
-                        "default": 10,
-                        "minimum": 1,
-                        "maximum": 20
-                    },
-                    "articles_per_source": {
-                        "type": "integer",
-                        "description": "每个来源获取的文章数量",
-                        "default": 8,
-                        "minimum": 1,
-                        "maximum": 15
-                    },
-                    "sources": {
-                        "type": "array",
-                        "description": "指定新闻来源",
-                        "items": {
-                            "type": "string",
-                            "enum": ["TechCrunch", "Wired", "36Kr", "MIT"]
-                        },
-                        "default": ["TechCrunch", "Wired", "36Kr", "MIT"]
-                    }
+    # 工具模式定义只依赖类属性，在类定义时构建一次
+    _TOOL_SCHEMA = {
+        "name": name,
+        "description": description,
+        "parameters": {
+            "type": "object",
+            "properties": {
+                "enable_ai_summary": {
+                    "type": "boolean",
+                    "description": "是否启用AI摘要生成",
+                    "default": True
                 },
-                "required": []
-            },
-            "returns": {
-                "type": "object",
-                "properties": {
-                    "success": {
-                        "type": "boolean",
-                        "description": "任务执行是否成功"
-                    },
-                    "pdf_data": {
+                "total_articles": {
+                    "type": "integer",
+                    "description": "需要获取的文章总数",
+                    "default": 10,
+                    "minimum": 1,
+                    "maximum": 20
+                },
+                "articles_per_source": {
+                    "type": "integer",
+                    "description": "每个来源获取的文章数量",
+                    "default": 8,
+                    "minimum": 1,
+                    "maximum": 15
+                },
+                "sources": {
+                    "type": "array",
+                    "description": "指定新闻来源",
+                    "items": {
                         "type": "string",
-                        "format": "binary",
-                        "description": "PDF报告的二进制数据"
+                        "enum": ["TechCrunch", "Wired", "36Kr", "MIT"]
                     },
-                    "metadata": {
-                        "type": "object",
-                        "description": "执行元数据信息"
-                    }
+                    "default": ["TechCrunch", "Wired", "36Kr", "MIT"]
+                }
+            },
+            "required": []
+        },
+        "returns": {
+            "type": "object",
+            "properties": {
+                "success": {
+                    "type": "boolean",
+                    "description": "任务执行是否成功"
+                },
+                "pdf_data": {
+                    "type": "string",
+                    "format": "binary",
+                    "description": "PDF报告的二进制数据"
+                },
+                "metadata": {
+                    "type": "object",
+                    "description": "执行元数据信息"
                 }
             }
         }
+    }
+
+    def get_tool_schema(self) -> Dict[str, Any]:
+        """
+        获取工具的模式定义，用于LLM工具调用
+
+        Returns:
+            Dict: 工具的模式定义（类级共享，调用方不要修改）
+        """
+        return self._TOOL_SCHEMA
 
 
 # 使用示例 - 专门为Render平台设计